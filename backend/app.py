@@ -1,24 +1,423 @@
-from os import environ
-from flask import Flask, request, jsonify
+from os import environ, makedirs, path
+import gzip
+import hashlib
+import hmac
+import threading
+import time
+from contextvars import ContextVar
+from functools import partial, wraps
+from flask import Flask, Response, g, request, jsonify, send_file
+from flask.json.provider import DefaultJSONProvider
 from flask_cors import CORS, cross_origin
-from modules.demand_predictor import get_demand_forecast
+from modules.demand_predictor import get_demand_forecast, get_forecast_residuals
 from modules.optimizer import run_optimization
+from modules.model_cache import ModelCache, series_fingerprint
+from modules.policy_store import PolicyStore, params_key
+from modules.registry import DEFAULT_COMPONENT, DatasetRegistry, UnknownComponent
+from modules.result_store import ResultStore
+from modules.scheduler import Scheduler, acquire_leader_lock
+from modules.rollups import GRANULARITIES
+from modules import bulk_io
+from modules import metrics
+from modules import profiling
+from modules.serialization import (
+    RESPONSE_FORMATS, downsample_columns, records_to_columns, to_format)
 import pandas as pd
 import sys
-import google.generativeai as genai
 sys.path.append('modules')
 
+class TimedJSONProvider(DefaultJSONProvider):
+    """Default JSON provider that records serialization time as a stage."""
+
+    def dumps(self, obj, **kwargs):
+        with metrics.timed("json_serialization"):
+            return super().dumps(obj, **kwargs)
+
+
 app = Flask(__name__)
+app.json = TimedJSONProvider(app)
+# Pagination metadata for GET /data travels in headers so the body stays a list
+app.config['CORS_EXPOSE_HEADERS'] = [
+    'ETag', 'X-Total-Count', 'X-Next-Offset', 'Server-Timing', 'X-Profile-Id']
 CORS(app)
 
-# Configure Gemini API
-api_key = environ.get('GEMINI_API_KEY')
-if not api_key:
-    print("Warning: GEMINI_API_KEY environment variable not set. Gemini features will not work.")
-else:
-    genai.configure(api_key=api_key)
+BASE_DIR = path.dirname(path.abspath(__file__))
+
+# Absolute by default so the app works from any working directory (e.g. under
+# a WSGI server); override with the CSV_PATH environment variable.
+CSV_PATH = environ.get('CSV_PATH', path.join(BASE_DIR, 'data', 'daily_sales.csv'))
+
+# On-demand request profiling is only available when PROFILE_TOKEN is set
+PROFILE_TOKEN = environ.get('PROFILE_TOKEN')
+PROFILE_DIR = environ.get('PROFILE_DIR', path.join(BASE_DIR, 'profiles'))
+
+# Under gunicorn every process writes its metrics here and /metrics sums
+# them (see gunicorn.conf.py and metrics.enable_multiprocess)
+METRICS_DIR = environ.get('METRICS_DIR', path.join(BASE_DIR, 'data', 'metrics'))
+
+# Last optimal (R, Q) per component and parameter set; re-optimizations
+# start from it instead of searching the whole grid
+policy_store = PolicyStore(environ.get(
+    'OPTIMIZER_STATE_DIR', path.join(BASE_DIR, 'data', 'optimizer_state')))
+
+# One dataset per component, selected with ?component=<id>: 'default' is
+# CSV_PATH, any other id data/components/<id>.csv. Each is parsed once and
+# shared by all handlers; mutations are written through to its CSV and
+# invalidate that component's forecast/optimization caches.
+registry = DatasetRegistry(
+    CSV_PATH,
+    environ.get('COMPONENTS_DIR', path.join(BASE_DIR, 'data', 'components')),
+    max_loaded=int(environ.get('MAX_LOADED_COMPONENTS', 128)),
+    on_load=lambda component: _watch_component(component))
+
+# Trained forecasters and their features per component, bounded in memory
+# and persisted to disk so evicted models reload instead of retraining
+model_cache = ModelCache(
+    environ.get('MODEL_DIR', path.join(BASE_DIR, 'data', 'models')),
+    max_bytes=int(environ.get('MODEL_CACHE_MB', 512)) * 1024 * 1024)
+
+# Forecasts and optimizations persisted per component and sales history, so
+# every worker (and a restarted server) can serve them without recomputing
+PRECOMPUTED_DIR = environ.get('PRECOMPUTED_DIR', path.join(BASE_DIR, 'data', 'precomputed'))
+result_store = ResultStore(PRECOMPUTED_DIR)
+
+# Background precomputation (see start_scheduler). Components are refreshed
+# after their data changes (debounced) and all of them every
+# PRECOMPUTE_INTERVAL seconds, preferably while no request is in flight.
+# Changes written by other workers are noticed within PRECOMPUTE_WATCH_INTERVAL.
+PRECOMPUTE_INTERVAL = float(environ.get('PRECOMPUTE_INTERVAL', 3600))
+PRECOMPUTE_DEBOUNCE = float(environ.get('PRECOMPUTE_DEBOUNCE', 30))
+PRECOMPUTE_WATCH_INTERVAL = float(environ.get('PRECOMPUTE_WATCH_INTERVAL', 5))
+PRIORITY_CHANGED = 0
+PRIORITY_CADENCE = 1
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+scheduler = Scheduler(
+    max_workers=int(environ.get('PRECOMPUTE_WORKERS', 1)),
+    is_idle=lambda: _in_flight == 0)
+_leader_lock = None
+
+# Parameters of a plain POST /optimize-inventory; precomputed in the background
+DEFAULT_OPTIMIZATION = dict(horizon=90, h=5.0, p=20.0, K=200.0, L=1, n_sims=200,
+                            warm_start=True, target_fill_rate=None, scenarios='normal')
+
+# Demand scenario samplers of /optimize-inventory: normal noise around the
+# forecast, or the forecaster's own holdout errors (block-bootstrapped)
+SCENARIO_MODES = ("normal", "residual")
+
+# Set once warm_up() has finished; reported by /ready
+warm = threading.Event()
+
+# Columns GET /data may return via ?fields=; 'index' is the row position used
+# by /data/<index>
+DATA_FIELDS = ('index', 'date', 'store', 'sales')
+DEFAULT_DATA_FIELDS = ['date', 'sales']
+
+# Responses smaller than this are not worth gzipping
+COMPRESS_MIN_BYTES = 1024
+
+
+@app.before_request
+def start_timing():
+    g.request_start = time.perf_counter()
+    metrics.start_request()
+
+
+@app.before_request
+def track_in_flight():
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += 1
+    g.in_flight = True
+
+
+@app.teardown_request
+def untrack_in_flight(exc):
+    global _in_flight
+    if g.pop('in_flight', False):
+        with _in_flight_lock:
+            _in_flight -= 1
+
+
+@app.after_request
+def record_timing(response):
+    """Record request latency and expose the stage breakdown as Server-Timing."""
+    elapsed = time.perf_counter() - g.get('request_start', time.perf_counter())
+    endpoint = request.url_rule.rule if request.url_rule else 'unmatched'
+    response.headers['Server-Timing'] = metrics.finish_request(
+        endpoint, request.method, response.status_code, elapsed)
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """Gzip sizeable JSON/CSV bodies for clients that accept it."""
+    if (response.status_code != 200
+            or response.is_streamed
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or not request.accept_encodings['gzip']
+            or response.mimetype not in ('application/json', 'text/csv')):
+        return response
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    response.set_data(gzip.compress(body, compresslevel=6))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def _clean_data(df):
+    """Typed, NaN-free view of the dataset that GET /data pages through."""
+    df_clean = df.copy()
+    df_clean['index'] = df_clean.index
+    df_clean['date'] = df_clean['date'].astype(str)
+    df_clean['sales'] = pd.to_numeric(df_clean['sales'], errors='coerce')
+    return df_clean.dropna(subset=['date', 'sales'])
+
+
+def _filter_data(df_clean, args):
+    """
+    Apply the GET /data query filters (start, end, store) to the clean frame.
+
+    Dates are stored as ISO strings, so range filters compare normalized
+    strings instead of parsing the whole date column on every request.
+    """
+    start = args.get('start')
+    end = args.get('end')
+    store = args.get('store')
+    if start:
+        start = pd.Timestamp(start).strftime('%Y-%m-%d')
+        df_clean = df_clean[df_clean['date'] >= start]
+    if end:
+        end = pd.Timestamp(end).strftime('%Y-%m-%d')
+        df_clean = df_clean[df_clean['date'] <= end]
+    if store:
+        if 'store' not in df_clean.columns:
+            return df_clean.iloc[0:0]
+        df_clean = df_clean[df_clean['store'] == int(store)]
+    return df_clean
+
+
+def _int_param(data, key, default, minimum):
+    """
+    Integer field `key` of a request body. Whole-number floats (30.0) are
+    accepted; anything else raises ValueError, so that odd values are a 400
+    here rather than a bad forecast or result cache key later.
+    """
+    value = data.get(key, default)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = None
+    if isinstance(value, bool) or number is None or not number.is_integer() or number < minimum:
+        raise ValueError(f"{key} must be an integer of at least {minimum}")
+    return int(number)
+
+
+def with_component(create=False):
+    """
+    Pass the Component named by ?component= (default: 'default') to the view
+    as its first argument. Unknown components are a 404.
+
+    With `create` set the view instead gets a function returning the
+    Component, creating an empty dataset for an unknown id on first call.
+    Views call it only once they have rows to write, so a request rejected
+    during validation leaves no component behind.
+    """
+    def decorate(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            component_id = request.args.get('component', DEFAULT_COMPONENT)
+            try:
+                if create:
+                    # Reject a bad id now rather than at the first write
+                    registry.csv_path(component_id)
+                    component = partial(registry.get, component_id, create=True)
+                else:
+                    component = registry.get(component_id)
+            except UnknownComponent:
+                return jsonify({"error": f"Unknown component: {component_id}"}), 404
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            return view(component, *args, **kwargs)
+        return wrapper
+    return decorate
+
+
+# Set for a request being profiled (see profiled): forecasts, models and
+# optimizations are recomputed instead of served from any cache, so the
+# profile shows the pipeline rather than a cache lookup
+_recompute = ContextVar('recompute', default=False)
+
+
+def _models():
+    """The model cache, or None while recomputing."""
+    return None if _recompute.get() else model_cache
+
+
+def _stored(component, name, compute):
+    """compute(), or its persisted result for the component's current history."""
+    fingerprint = series_fingerprint(component.rollups.daily_frame())
+    value = None if _recompute.get() else result_store.get(
+        component.component_id, name, fingerprint)
+    if value is None:
+        value = compute()
+        result_store.put(component.component_id, name, fingerprint, value)
+    return value
+
+
+def _forecast(component, horizon=90):
+    """Cached demand forecast for `component`, training only on new data."""
+    return component.forecast_cache.get_or_compute(
+        ('forecast', horizon),
+        lambda df: _stored(component, f"forecast-{horizon}", lambda: get_demand_forecast(
+            df=component.rollups.daily_frame(), horizon=horizon,
+            model_cache=_models(), component_id=component.component_id)),
+        refresh=_recompute.get())
+
+
+def _residuals(component):
+    """Cached out-of-sample forecast residuals for `component`."""
+    return component.forecast_cache.get_or_compute(
+        ('residuals',),
+        lambda df: _stored(component, "residuals", lambda: get_forecast_residuals(
+            df=component.rollups.daily_frame(), model_cache=_models(),
+            component_id=component.component_id).tolist()),
+        refresh=_recompute.get())
+
+
+def _optimization(component, forecast, horizon, h, p, K, L, n_sims,
+                  warm_start, target_fill_rate, scenarios='normal'):
+    """Cached optimization result (columnar) for `component`'s forecast."""
+    def compute():
+        residuals = _residuals(component) if scenarios == 'residual' else None
+        forecast_df = pd.DataFrame(forecast)
+        forecast_df['date'] = pd.to_datetime(forecast_df['date'])
+        return run_optimization(
+            df_pred=forecast_df,
+            h=h,
+            p=p,
+            K=K,
+            L=L,
+            n_sims=n_sims,
+            n_jobs=4,
+            output_format='columnar',
+            policy_store=policy_store if warm_start else None,
+            component_id=component.component_id,
+            target_fill_rate=target_fill_rate,
+            residuals=residuals
+        )
+
+    params = {'horizon': horizon, 'h': h, 'p': p, 'K': K, 'L': L, 'n_sims': n_sims,
+              'warm_start': warm_start}
+    if target_fill_rate is not None:
+        params['target_fill_rate'] = target_fill_rate
+    if scenarios != 'normal':
+        params['residual_scenarios'] = 1
+    return component.optimization_cache.get_or_compute(
+        ('optimization', horizon, h, p, K, L, n_sims, warm_start, target_fill_rate, scenarios),
+        lambda df: _stored(component, f"optimization-{params_key(params)}", compute),
+        refresh=_recompute.get())
+
+
+def _precompute(component_id):
+    """Refresh the default forecast and optimization of one component."""
+    component = registry.get(component_id)
+    settings = dict(DEFAULT_OPTIMIZATION)
+    forecast = _forecast(component, settings['horizon'])
+    _optimization(component, forecast, **settings)
+
+
+def _schedule(component_id, priority, delay=0.0):
+    scheduler.submit(('precompute', component_id),
+                     lambda: _precompute(component_id), priority=priority, delay=delay)
+
+
+def _schedule_all():
+    for component_id in registry.ids():
+        _schedule(component_id, PRIORITY_CADENCE)
+
 
-CSV_PATH = "data/daily_sales.csv"
+def _watch_component(component):
+    # Refresh in the background once writes to the component settle
+    component.dataset.subscribe(
+        lambda version: _schedule(component.component_id, PRIORITY_CHANGED,
+                                  PRECOMPUTE_DEBOUNCE))
+
+
+def _check_for_writes():
+    # A write served by another worker only reaches this process when it
+    # next reads the component; reading reloads a changed CSV (one stat
+    # otherwise), and the reload notifies _watch_component's subscriber
+    for component in registry.loaded():
+        component.dataset.read()
+
+
+# Load the default dataset at import time, i.e. before workers fork
+registry.get(DEFAULT_COMPONENT)
+
+
+def start_scheduler():
+    """
+    Start background precomputation in this process.
+
+    Of several worker processes only the first to call this runs the
+    scheduler (an flock on PRECOMPUTED_DIR/scheduler.lock); the others serve
+    its persisted results. Disabled with PRECOMPUTE=0.
+    """
+    global _leader_lock
+    if environ.get('PRECOMPUTE', '1') == '0' or scheduler.started:
+        return False
+    makedirs(PRECOMPUTED_DIR, exist_ok=True)
+    _leader_lock = acquire_leader_lock(path.join(PRECOMPUTED_DIR, 'scheduler.lock'))
+    if _leader_lock is None:
+        return False
+    scheduler.start()
+    scheduler.every(PRECOMPUTE_INTERVAL, _schedule_all)
+    scheduler.every(PRECOMPUTE_WATCH_INTERVAL, _check_for_writes,
+                    initial_delay=PRECOMPUTE_WATCH_INTERVAL)
+    print("✓ Background precomputation started")
+    return True
+
+
+def _is_profile_admin():
+    token = request.headers.get('X-Profile-Token', '')
+    # Compared as bytes: compare_digest rejects non-ASCII str
+    return bool(PROFILE_TOKEN) and hmac.compare_digest(
+        token.encode('utf-8'), PROFILE_TOKEN.encode('utf-8'))
+
+
+def profiled(view):
+    """
+    Let admins profile a single call of `view`.
+
+    Requests with ?profile=1 (or an `X-Profile: 1` header) and a valid
+    X-Profile-Token run under cProfile + tracemalloc, recomputing everything
+    the view would otherwise serve from a cache; the stored profile id is
+    returned in the X-Profile-Id header. Other requests are untouched.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.args.get('profile') != '1' and request.headers.get('X-Profile') != '1':
+            return view(*args, **kwargs)
+        if not _is_profile_admin():
+            return jsonify({
+                "success": False,
+                "error": "Profiling requires a valid X-Profile-Token"
+            }), 403
+        recompute = _recompute.set(True)
+        try:
+            with profiling.RequestProfiler(PROFILE_DIR, request.endpoint) as prof:
+                response = app.make_response(view(*args, **kwargs))
+        except profiling.ProfilerBusy as e:
+            return jsonify({"success": False, "error": str(e)}), 409
+        finally:
+            _recompute.reset(recompute)
+        response.headers['X-Profile-Id'] = prof.profile_id
+        return response
+    return wrapper
 
 
 @app.route('/ping', methods=['GET'])
@@ -27,6 +426,67 @@ def ping():
     return jsonify({"response": "pong"})
 
 
+@app.route('/ready', methods=['GET'])
+@cross_origin()
+def ready():
+    """Readiness probe: 200 once warm_up() has finished, 503 before."""
+    if warm.is_set():
+        return jsonify({
+            "ready": True,
+            "dataset_version": registry.get(DEFAULT_COMPONENT).dataset.version
+        })
+    return jsonify({"ready": False}), 503
+
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage and request latency histograms in Prometheus text format."""
+    return Response(metrics.render_prometheus(),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@app.route('/profiles', methods=['GET'])
+@cross_origin()
+def get_profiles():
+    """List stored request profiles (admin only)."""
+    if not _is_profile_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    return jsonify(profiling.list_profiles(PROFILE_DIR))
+
+
+@app.route('/profiles/<profile_id>/<kind>', methods=['GET'])
+@cross_origin()
+def download_profile(profile_id, kind):
+    """
+    Download a stored profile (admin only). kind is 'prof' (pstats dump for
+    snakeviz/pstats), 'txt' (readable summary) or 'json' (metadata).
+    """
+    if not _is_profile_admin():
+        return jsonify({"error": "Forbidden"}), 403
+    file_path = profiling.profile_path(PROFILE_DIR, profile_id, kind)
+    if file_path is None:
+        return jsonify({"error": "Profile not found"}), 404
+    return send_file(file_path, mimetype=profiling.PROFILE_KINDS[kind],
+                     as_attachment=(kind == 'prof'))
+
+
+@app.route('/components', methods=['GET'])
+@cross_origin()
+def list_components():
+    """Component ids with data, and model cache usage."""
+    return jsonify({
+        "components": registry.ids(),
+        "model_cache": model_cache.stats()
+    })
+
+
+@app.route('/precompute', methods=['GET'])
+@cross_origin()
+def precompute_status():
+    """Background precomputation queue of the worker that answers."""
+    return jsonify({"leader": _leader_lock is not None, **scheduler.stats()})
+
+
 @app.route('/')
 def hello():
     return 'Hello, World!'
@@ -34,13 +494,14 @@ def hello():
 
 @app.route('/predict-demand', methods=['GET'])
 @cross_origin()
-def predict_demand():
+@profiled
+@with_component()
+def predict_demand(component):
     try:
         # Get days parameter from query string, default to 90
         days = int(request.args.get('days', 90))
 
-        csv_path = CSV_PATH
-        forecast = get_demand_forecast(csv_path=csv_path)
+        forecast = _forecast(component)
 
         return jsonify({
             "success": True,
@@ -56,42 +517,217 @@ def predict_demand():
 
 @app.route('/data', methods=['GET'])
 @cross_origin()
-def get_data():
+@with_component()
+def get_data(component):
+    """
+    Return sales rows as a JSON list.
+
+    Query parameters (all optional):
+        start, end: inclusive date range (YYYY-MM-DD)
+        store: only rows for this store id
+        fields: comma-separated subset of index,date,store,sales
+                (default: date,sales)
+        offset, limit: page through the filtered rows; the total is returned
+                in X-Total-Count and the next page start in X-Next-Offset
+
+    Responses carry an ETag tied to the dataset contents and query, so
+    If-None-Match requests are answered with 304 while the data is unchanged.
+    """
     try:
-        df = pd.read_csv(CSV_PATH)
-        # Select only the columns we need and clean the data
-        df_clean = df[['date', 'sales']].copy()
-        # Ensure date is string and sales is number
-        df_clean['date'] = df_clean['date'].astype(str)
-        df_clean['sales'] = pd.to_numeric(df_clean['sales'], errors='coerce')
-        # Drop any rows with NaN values
-        df_clean = df_clean.dropna()
-        return jsonify(df_clean.to_dict(orient='records'))
+        tag = component.dataset.tag()
+
+        query = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items()))
+        etag = f"{tag}-{hashlib.md5(query.encode()).hexdigest()[:12]}"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+
+        fields = request.args.get('fields')
+        fields = fields.split(',') if fields else DEFAULT_DATA_FIELDS
+        unknown = [f for f in fields if f not in DATA_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+        df_clean = component.data_view_cache.get_or_compute('clean', _clean_data)
+        df_clean = _filter_data(df_clean, request.args)
+        total = len(df_clean)
+
+        offset = int(request.args.get('offset', 0))
+        limit = request.args.get('limit')
+        if offset < 0 or (limit is not None and int(limit) < 0):
+            return jsonify({"error": "offset and limit must be non-negative"}), 400
+        stop = total if limit is None else min(offset + int(limit), total)
+        page = df_clean.iloc[offset:stop]
+
+        if 'store' in fields:
+            if 'store' not in page.columns:
+                page = page.assign(store=None)
+            # Single-series rows have no store; NaN is not valid JSON
+            store = page['store'].astype(object)
+            page = page.assign(store=store.where(store.notna(), None))
+
+        response = jsonify(page[fields].to_dict(orient='records'))
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Total-Count'] = str(total)
+        if offset < stop < total:
+            response.headers['X-Next-Offset'] = str(stop)
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
 @app.route('/data', methods=['POST'])
 @cross_origin()
-def bulk_insert_data():
+@with_component(create=True)
+def bulk_insert_data(open_component):
     try:
-        data = request.get_json()
-        if not isinstance(data, list):
+        data = request.get_json(silent=True)
+        if not isinstance(data, list) or not all(isinstance(row, dict) for row in data):
             return jsonify({"error": "Data must be a list of objects"}), 400
-        df_existing = pd.read_csv(CSV_PATH)
-        df_new = pd.DataFrame(data)
-        df_combined = pd.concat([df_existing, df_new], ignore_index=True)
-        df_combined.to_csv(CSV_PATH, index=False)
-        return jsonify({"message": f"Inserted {len(data)} entries"})
+        if not data:
+            return jsonify({"error": "No rows to insert"}), 400
+        start_index = open_component().dataset.append(data)
+        return jsonify({
+            "message": f"Inserted {len(data)} entries",
+            "start_index": start_index
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/data/import', methods=['POST'])
+@cross_origin()
+@with_component(create=True)
+def import_data(open_component):
+    """
+    Stream a large NDJSON or CSV upload into the dataset.
+
+    The body is read line by line; rows are validated and committed in
+    chunks of `chunk_size` (query parameter, default 5000), so memory stays
+    bounded regardless of upload size. Invalid rows are skipped and reported
+    per chunk; valid rows in the same chunk are still inserted.
+
+    Content-Type: application/x-ndjson (one JSON object per line) or
+    text/csv (header line required). Rows need `date` and `sales`; `store`
+    is optional.
+    """
+    try:
+        chunk_rows = int(request.args.get('chunk_size', bulk_io.CHUNK_ROWS))
+        if chunk_rows <= 0:
+            return jsonify({"error": "chunk_size must be positive"}), 400
+
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            parsed = bulk_io.iter_ndjson_rows(request.stream)
+        elif request.mimetype == 'text/csv':
+            parsed = bulk_io.iter_csv_rows(request.stream)
+        else:
+            return jsonify({
+                "error": "Content-Type must be application/x-ndjson or text/csv"
+            }), 415
+
+        chunks = []
+        inserted = rejected = 0
+        for i, (rows, errors) in enumerate(bulk_io.iter_chunks(parsed, chunk_rows)):
+            if rows:
+                open_component().dataset.append(rows)
+            inserted += len(rows)
+            rejected += len(errors)
+            chunks.append({
+                "chunk": i,
+                "inserted": len(rows),
+                "rejected": len(errors),
+                "errors": errors[:bulk_io.MAX_ERRORS_PER_CHUNK]
+            })
+
+        return jsonify({
+            "message": f"Inserted {inserted} entries, rejected {rejected}",
+            "inserted": inserted,
+            "rejected": rejected,
+            "chunks": chunks
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+@app.route('/data/export', methods=['GET'])
+@cross_origin()
+@with_component()
+def export_data(component):
+    """
+    Stream the full dataset as CSV (default) or NDJSON (?format=ndjson).
+
+    Rows are serialized in chunks from a snapshot taken when the request
+    starts, so concurrent edits do not affect an export in progress.
+    """
+    fmt = request.args.get('format', 'csv')
+    df, _ = component.dataset.read()
+    if fmt == 'csv':
+        return Response(bulk_io.stream_csv(df), mimetype='text/csv',
+                        headers={'Content-Disposition': 'attachment; filename=sales.csv'})
+    if fmt == 'ndjson':
+        return Response(bulk_io.stream_ndjson(df), mimetype='application/x-ndjson')
+    return jsonify({"error": "format must be csv or ndjson"}), 400
+
+
+@app.route('/rollups/<granularity>', methods=['GET'])
+@cross_origin()
+@with_component()
+def get_rollup(component, granularity):
+    """
+    Precomputed sales totals per period: daily, weekly (keyed by Monday) or
+    monthly (YYYY-MM). Optional query parameters: store, start, end
+    (inclusive period keys). Supports If-None-Match like GET /data.
+    """
+    try:
+        if granularity not in GRANULARITIES:
+            return jsonify({
+                "error": f"granularity must be one of {', '.join(GRANULARITIES)}"
+            }), 404
+        tag = component.dataset.tag()
+        etag = f"{tag}-{hashlib.md5(request.query_string).hexdigest()[:12]}"
+        if request.if_none_match.contains_weak(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        store = request.args.get('store')
+        series = component.rollups.series(
+            granularity,
+            store=int(store) if store else None,
+            start=request.args.get('start'),
+            end=request.args.get('end'))
+        response = jsonify(series)
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/rollups', methods=['GET'])
+@cross_origin()
+@with_component()
+def list_rollups(component):
+    """Available rollup granularities and store ids."""
+    return jsonify({
+        "granularities": list(GRANULARITIES),
+        "stores": component.rollups.stores()
+    })
+
+
 @app.route('/data/<int:index>', methods=['GET'])
 @cross_origin()
-def get_data_entry(index):
+@with_component()
+def get_data_entry(component, index):
     try:
-        df = pd.read_csv(CSV_PATH)
+        df, _ = component.dataset.read()
         if index < 0 or index >= len(df):
             return jsonify({"error": "Index out of range"}), 404
         entry = df.iloc[index].to_dict()
@@ -104,16 +740,12 @@ def get_data_entry(index):
 
 @app.route('/data/<int:index>', methods=['PUT'])
 @cross_origin()
-def edit_data_entry(index):
+@with_component()
+def edit_data_entry(component, index):
     try:
         data = request.get_json()
-        df = pd.read_csv(CSV_PATH)
-        if index < 0 or index >= len(df):
+        if not component.dataset.update(index, data):
             return jsonify({"error": "Index out of range"}), 404
-        for key, value in data.items():
-            if key in df.columns:
-                df.at[index, key] = value
-        df.to_csv(CSV_PATH, index=False)
         return jsonify({"message": "Entry updated"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -121,13 +753,11 @@ def edit_data_entry(index):
 
 @app.route('/data/<int:index>', methods=['DELETE'])
 @cross_origin()
-def delete_data_entry(index):
+@with_component()
+def delete_data_entry(component, index):
     try:
-        df = pd.read_csv(CSV_PATH)
-        if index < 0 or index >= len(df):
+        if not component.dataset.delete(index):
             return jsonify({"error": "Index out of range"}), 404
-        df = df.drop(index)
-        df.to_csv(CSV_PATH, index=False)
         return jsonify({"message": "Entry deleted"})
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -135,7 +765,9 @@ def delete_data_entry(index):
 
 @app.route('/optimize-inventory', methods=['POST'])
 @cross_origin()
-def optimize_inventory():
+@profiled
+@with_component()
+def optimize_inventory(component):
     """
     Complete inventory optimization endpoint:
     1. Generates 90-day demand forecast using the demand predictor
@@ -150,7 +782,13 @@ def optimize_inventory():
             "stockout_penalty": 20.0,  // cost per lost sale
             "ordering_cost": 200.0,  // fixed cost per order
             "lead_time": 1,  // lead time in days
-            "n_simulations": 200  // number of Monte Carlo simulations
+            "n_simulations": 200,  // number of Monte Carlo simulations
+            "format": "records",  // or "columnar": one array per field
+            "include_daily_simulation": true,  // false omits daily_simulation
+            "daily_simulation_step": 1,  // keep every Nth simulated day
+            "warm_start": true,  // false searches the full grid from scratch
+            "target_fill_rate": 0.95,  // cheapest policy with at least this fill rate
+            "scenarios": "normal"  // or "residual": demand = forecast + model errors
         }
 
     Returns:
@@ -161,6 +799,7 @@ def optimize_inventory():
             "cost_summary": {...},  // breakdown of costs
             "performance_metrics": {...},  // fill rate, stockouts, etc.
             "monte_carlo_stats": {...},  // statistical metrics from simulations
+            "search": {...},  // warm/cold, policies evaluated vs grid size
             "daily_simulation": [...],  // day-by-day inventory tracking
             "message": "..."
         }
@@ -169,33 +808,55 @@ def optimize_inventory():
         # Get parameters from request or use defaults
         data = request.get_json() if request.is_json else {}
 
-        horizon = data.get('horizon', 90)
+        try:
+            horizon = _int_param(data, 'horizon', 90, minimum=1)
+            L = _int_param(data, 'lead_time', 1, minimum=0)
+            n_sims = _int_param(data, 'n_simulations', 200, minimum=1)
+        except ValueError as e:
+            return jsonify({"success": False, "error": str(e)}), 400
         h = data.get('holding_cost', 5.0)
         p = data.get('stockout_penalty', 20.0)
         K = data.get('ordering_cost', 200.0)
-        L = data.get('lead_time', 1)
-        n_sims = data.get('n_simulations', 200)
+        warm_start = bool(data.get('warm_start', True))
+        target_fill_rate = data.get('target_fill_rate')
+        if target_fill_rate is not None:
+            target_fill_rate = float(target_fill_rate)
+            if not 0 < target_fill_rate <= 1:
+                return jsonify({
+                    "success": False,
+                    "error": "target_fill_rate must be in (0, 1]"
+                }), 400
+        scenarios = data.get('scenarios', 'normal')
+        if scenarios not in SCENARIO_MODES:
+            return jsonify({
+                "success": False,
+                "error": f"scenarios must be one of {', '.join(SCENARIO_MODES)}"
+            }), 400
+
+        fmt = data.get('format', 'records')
+        if fmt not in RESPONSE_FORMATS:
+            return jsonify({
+                "success": False,
+                "error": f"format must be one of {', '.join(RESPONSE_FORMATS)}"
+            }), 400
+        daily_step = int(data.get('daily_simulation_step', 1))
+        if daily_step < 1:
+            return jsonify({
+                "success": False,
+                "error": "daily_simulation_step must be at least 1"
+            }), 400
 
         # Step 1: Generate demand forecast
         print(f"Generating {horizon}-day demand forecast...")
-        forecast = get_demand_forecast(csv_path=CSV_PATH, horizon=horizon)
+        forecast = _forecast(component, horizon)
 
-        # Convert forecast to DataFrame
-        forecast_df = pd.DataFrame(forecast)
-        forecast_df['date'] = pd.to_datetime(forecast_df['date'])
-
-        # Step 2: Run optimization
+        # Step 2: Run optimization (cached in columnar form; rendered in the
+        # requested format below)
         print(
             f"Running inventory optimization with h={h}, p={p}, K={K}, L={L}...")
-        optimization_results = run_optimization(
-            df_pred=forecast_df,
-            h=h,
-            p=p,
-            K=K,
-            L=L,
-            n_sims=n_sims,
-            n_jobs=4
-        )
+        optimization_results = _optimization(
+            component, forecast, horizon, h, p, K, L, n_sims, warm_start, target_fill_rate,
+            scenarios)
 
         # Build human-readable explanation from results
         opt = optimization_results.get('optimal_policy', {})
@@ -212,19 +873,25 @@ def optimize_inventory():
         # Step 3: Prepare comprehensive response
         response = {
             "success": True,
-            "forecast": forecast,
+            "forecast": forecast if fmt == 'records' else records_to_columns(forecast),
             "optimal_policy": optimization_results['optimal_policy'],
             "cost_summary": optimization_results['cost_summary'],
             "performance_metrics": optimization_results['performance_metrics'],
             "monte_carlo_stats": optimization_results['monte_carlo_stats'],
-            "daily_simulation": optimization_results['daily_simulation'],
+            "search": optimization_results['search'],
             "explanation": explanation,
             "message": f"Optimization completed successfully. Optimal policy: R={optimization_results['optimal_policy']['reorder_point']:.0f}, Q={optimization_results['optimal_policy']['order_quantity']:.0f}"
         }
 
+        if data.get('include_daily_simulation', True):
+            response['daily_simulation'] = to_format(
+                downsample_columns(optimization_results['daily_simulation'], daily_step), fmt)
+        if fmt == 'columnar':
+            response['format'] = 'columnar'
+
         # Optional: include all tested policies if requested
         if data.get('include_all_policies', False):
-            response['all_policies'] = optimization_results['all_policies']
+            response['all_policies'] = to_format(optimization_results['all_policies'], fmt)
 
         print(
             f"✓ Optimization complete: R={optimization_results['optimal_policy']['reorder_point']:.0f}, Q={optimization_results['optimal_policy']['order_quantity']:.0f}")
@@ -246,6 +913,34 @@ def optimize_inventory():
         }), 500
 
 
+def warm_up():
+    """
+    Import the heavy modules and compute the default forecast.
+
+    In production this runs in the WSGI master before workers fork (see
+    wsgi.py / gunicorn.conf.py) so the imported libraries and cached results
+    are shared copy-on-write. Set WARMUP_OPTIMIZATION=1 to also precompute
+    the default /optimize-inventory result.
+    """
+    import lightgbm  # noqa: F401
+    import joblib  # noqa: F401
+    import tqdm  # noqa: F401
+
+    component = registry.get(DEFAULT_COMPONENT)
+    forecast = _forecast(component)
+
+    if environ.get('WARMUP_OPTIMIZATION') == '1':
+        _optimization(component, forecast, **DEFAULT_OPTIMIZATION)
+
+    warm.set()
+    print("✓ Warm-up complete")
+
+
 if __name__ == '__main__':
+    # Development server; use wsgi.py with gunicorn for production
     port = int(environ.get("PORT", 5000))
+    # Only in the reloader's serving child, not the file-watching parent
+    if environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        threading.Thread(target=warm_up, daemon=True).start()
+        start_scheduler()
     app.run(host='127.0.0.1', port=port, debug=True)
@@ -0,0 +1,45 @@
+# gunicorn.conf.py - Production server settings (gunicorn -c gunicorn.conf.py wsgi:app)
+import multiprocessing
+from os import environ
+
+bind = f"0.0.0.0:{environ.get('PORT', 5000)}"
+workers = int(environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Threads let cheap requests (/ready, /data) proceed while a worker is busy
+# with a long optimization
+worker_class = "gthread"
+threads = int(environ.get("GUNICORN_THREADS", 4))
+
+# Import the app and run warm_up() once in the master, then fork
+preload_app = True
+
+# Forecast + grid search can take minutes on large horizons
+timeout = int(environ.get("GUNICORN_TIMEOUT", 300))
+
+
+def on_starting(server):
+    # Runs in the master after the app is preloaded; metric files of a
+    # previous run would otherwise be summed into this one
+    from app import METRICS_DIR
+    from modules import metrics
+    metrics.clear_multiprocess_dir(METRICS_DIR)
+
+
+def when_ready(server):
+    # The master's own metrics (warm-up) are reported once, from its file
+    from app import METRICS_DIR
+    from modules import metrics
+    metrics.enable_multiprocess(METRICS_DIR)
+
+
+def post_fork(server, worker):
+    # Every worker adds its metrics to the shared directory, so any worker
+    # answering /metrics reports the whole server
+    from app import METRICS_DIR
+    from modules import metrics
+    metrics.enable_multiprocess(METRICS_DIR, reset=True)
+
+    # Threads do not survive fork, so background precomputation is started
+    # per worker; only the first worker to take its lock actually runs it
+    from app import start_scheduler
+    start_scheduler()
@@ -0,0 +1,231 @@
+"""
+Local load-testing harness for the Flask API.
+
+Generates a synthetic sales history, starts the app in-process on a free
+port (or targets --url), drives a weighted mix of requests at each
+concurrency level and reports throughput and p50/p95/p99 latency per
+endpoint. Runs fully offline - only the standard library and the app itself.
+
+    python loadtest.py --days 3650 --concurrency 1,8,32 --duration 20
+    python loadtest.py --mix get_data:60,insert:20,update:20 --concurrency 16
+    python loadtest.py --url http://127.0.0.1:5000 --mix get_data:1
+
+After the run the row count is checked against the number of successful
+inserts, which catches lost updates from unsynchronized read-modify-write.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+DEFAULT_MIX = "get_data:40,get_page:20,get_rollup:15,insert:10,update:10,optimize:5"
+
+
+def write_synthetic_csv(csv_path, days, seed=42):
+    """Daily sales with trend, weekly seasonality and noise, in the app's CSV layout."""
+    rng = random.Random(seed)
+    start = date(2013, 1, 1)
+    with open(csv_path, "w") as f:
+        f.write("date,sales,store,dow,week,month,day,quarter,is_weekend,year\n")
+        for i in range(days):
+            d = start + timedelta(days=i)
+            level = 15000 + 2 * i + (3000 if d.weekday() >= 5 else 0)
+            sales = max(0, int(rng.gauss(level, 1500)))
+            f.write(f"{d.isoformat()},{sales},,,,,,,,\n")
+
+
+class Workload:
+    """Request builders for each named workload."""
+
+    def __init__(self, base_url, days, horizon, n_sims):
+        self.base_url = base_url
+        self.days = days
+        self.horizon = horizon
+        self.n_sims = n_sims
+        self.inserted = 0
+        self._lock = threading.Lock()
+
+    def request(self, name):
+        """Return (method, path, body) for one request of workload `name`."""
+        if name == "get_data":
+            return "GET", "/data", None
+        if name == "get_page":
+            offset = random.randrange(max(self.days - 100, 1))
+            return "GET", f"/data?fields=index,date,sales&offset={offset}&limit=100", None
+        if name == "get_rollup":
+            return "GET", f"/rollups/{random.choice(['daily', 'weekly', 'monthly'])}", None
+        if name == "insert":
+            d = date(2013, 1, 1) + timedelta(days=random.randrange(self.days))
+            return "POST", "/data", [{"date": d.isoformat(), "sales": random.randint(1, 100)}]
+        if name == "update":
+            return "PUT", f"/data/{random.randrange(self.days)}", {"sales": random.randint(10000, 20000)}
+        if name == "optimize":
+            return "POST", "/optimize-inventory", {
+                "horizon": self.horizon, "n_simulations": self.n_sims,
+                "include_daily_simulation": False}
+        raise ValueError(f"Unknown workload: {name}")
+
+    def send(self, name):
+        """Send one request; returns (latency_seconds, ok)."""
+        method, path, body = self.request(name)
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={"Content-Type": "application/json", "Accept-Encoding": "gzip"})
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=600) as resp:
+                resp.read()
+                ok = resp.status < 400
+        except (urllib.error.URLError, OSError):
+            ok = False
+        elapsed = time.perf_counter() - start
+        if ok and name == "insert":
+            with self._lock:
+                self.inserted += 1
+        return elapsed, ok
+
+
+def parse_mix(spec):
+    names, weights = [], []
+    for part in spec.split(","):
+        name, _, weight = part.partition(":")
+        names.append(name.strip())
+        weights.append(float(weight or 1))
+    return names, weights
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float("nan")
+    k = max(0, min(len(sorted_values) - 1, int(round(q / 100 * len(sorted_values))) - 1))
+    return sorted_values[k]
+
+
+def run_level(workload, names, weights, concurrency, duration):
+    """Drive the mix with `concurrency` workers for `duration` seconds."""
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        while time.perf_counter() < deadline:
+            name = random.choices(names, weights)[0]
+            elapsed, ok = workload.send(name)
+            with lock:
+                latencies[name].append(elapsed)
+                if not ok:
+                    errors[name] += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    wall = time.perf_counter() - start
+    return latencies, errors, wall
+
+
+def print_report(concurrency, latencies, errors, wall):
+    print(f"\nConcurrency {concurrency}  (wall {wall:.1f}s)")
+    print(f"  {'endpoint':<12} {'requests':>8} {'errors':>6} {'req/s':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    total = 0
+    for name in sorted(latencies):
+        values = sorted(latencies[name])
+        total += len(values)
+        print(f"  {name:<12} {len(values):>8} {errors[name]:>6} {len(values) / wall:>8.1f} "
+              f"{percentile(values, 50) * 1000:>9.1f} {percentile(values, 95) * 1000:>9.1f} "
+              f"{percentile(values, 99) * 1000:>9.1f}")
+    print(f"  {'all':<12} {total:>8} {sum(errors.values()):>6} {total / wall:>8.1f}")
+
+
+def row_count(base_url):
+    with urllib.request.urlopen(f"{base_url}/data?limit=0") as resp:
+        return int(resp.headers["X-Total-Count"])
+
+
+def start_local_server(csv_path):
+    """
+    Import the app against `csv_path` and serve it on a free local port.
+
+    Everything the app persists (models, optimizer state, precomputed
+    results, components, profiles) goes next to the CSV, so a run never
+    touches the real backend/data.
+    """
+    data_dir = os.path.dirname(os.path.abspath(csv_path))
+    os.environ["CSV_PATH"] = csv_path
+    for name, subdir in (("COMPONENTS_DIR", "components"), ("MODEL_DIR", "models"),
+                         ("OPTIMIZER_STATE_DIR", "optimizer_state"),
+                         ("PRECOMPUTED_DIR", "precomputed"), ("PROFILE_DIR", "profiles")):
+        os.environ[name] = os.path.join(data_dir, subdir)
+    os.environ.setdefault("TQDM_DISABLE", "1")
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from werkzeug.serving import make_server
+    from app import app
+
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", help="Target a running server instead of starting one")
+    parser.add_argument("--days", type=int, default=1826, help="Synthetic history length")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help="Weighted workloads, e.g. get_data:60,insert:40 "
+                             "(get_data, get_page, get_rollup, insert, update, optimize)")
+    parser.add_argument("--concurrency", default="1,4,16", help="Comma-separated levels")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per level")
+    parser.add_argument("--horizon", type=int, default=30, help="optimize workload horizon")
+    parser.add_argument("--n-sims", type=int, default=20, help="optimize workload simulations")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    names, weights = parse_mix(args.mix)
+
+    server = None
+    if args.url:
+        base_url = args.url.rstrip("/")
+    else:
+        tmp_dir = tempfile.mkdtemp(prefix="aura-loadtest-")
+        csv_path = os.path.join(tmp_dir, "daily_sales.csv")
+        write_synthetic_csv(csv_path, args.days, args.seed)
+        print(f"Synthetic dataset: {args.days} days at {csv_path}")
+        server, base_url = start_local_server(csv_path)
+    print(f"Target: {base_url}  mix: {args.mix}")
+
+    workload = Workload(base_url, args.days, args.horizon, args.n_sims)
+    rows_before = row_count(base_url)
+    for level in (int(c) for c in args.concurrency.split(",")):
+        print_report(level, *run_level(workload, names, weights, level, args.duration))
+
+    rows_after = row_count(base_url)
+    lost = rows_before + workload.inserted - rows_after
+    print(f"\nRows: {rows_before} -> {rows_after}, successful inserts: {workload.inserted}")
+    if lost:
+        print(f"FAIL: {lost} inserted rows missing - concurrent writes clobbered each other")
+    else:
+        print("OK: no lost writes")
+
+    if server is not None:
+        server.shutdown()
+    sys.exit(1 if lost else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# bulk_io.py - Streaming parsers and serializers for bulk sales data
+
+import csv
+import json
+import math
+from datetime import date
+
+# Default number of rows parsed, validated and committed together
+CHUNK_ROWS = 5000
+
+# Per-chunk cap on reported row errors, so a bad file cannot blow up the report
+MAX_ERRORS_PER_CHUNK = 20
+
+
+def _decode(lines):
+    # (1-based line number, text) for each non-blank line
+    for line_no, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        line = line.strip()
+        if line:
+            yield line_no, line
+
+
+def iter_ndjson_rows(lines):
+    """
+    Yield (line_no, row_or_error) for newline-delimited JSON input.
+
+    Each non-blank line must be a JSON object; anything else is yielded as
+    an error string so one bad line does not abort the import.
+    """
+    for line_no, line in _decode(lines):
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, f"invalid JSON: {e}"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, "expected a JSON object"
+            continue
+        yield line_no, row
+
+
+def iter_csv_rows(lines):
+    """
+    Yield (line_no, row_or_error) for CSV input with a header line.
+
+    Rows are parsed one line at a time, so quoted fields must not contain
+    line breaks.
+    """
+    header = None
+    for line_no, line in _decode(lines):
+        fields = next(csv.reader([line]))
+        if header is None:
+            header = [f.strip() for f in fields]
+            continue
+        if len(fields) != len(header):
+            yield line_no, f"expected {len(header)} fields, got {len(fields)}"
+            continue
+        yield line_no, dict(zip(header, fields))
+
+
+def validate_row(row):
+    """
+    Normalize one imported row to {'date', 'sales'[, 'store']}.
+
+    Raises:
+        ValueError: if the date or sales value is missing or malformed.
+    """
+    if "date" not in row or "sales" not in row:
+        raise ValueError("row must have 'date' and 'sales'")
+    clean = {
+        "date": date.fromisoformat(str(row["date"]).strip()).isoformat(),
+        "sales": float(row["sales"]),
+    }
+    if not math.isfinite(clean["sales"]) or clean["sales"] < 0:
+        raise ValueError("sales must be a non-negative number")
+    if clean["sales"].is_integer():
+        # Keep whole-unit sales as integers, like the rest of the CSV
+        clean["sales"] = int(clean["sales"])
+    store = row.get("store")
+    if store not in (None, ""):
+        clean["store"] = int(float(store))
+    return clean
+
+
+def iter_chunks(parsed_rows, chunk_rows=CHUNK_ROWS):
+    """
+    Group parsed rows into validated chunks.
+
+    Yields:
+        (valid_rows, errors) per chunk of `chunk_rows` input rows, where
+        errors is a list of {'line': n, 'error': msg}.
+    """
+    valid, errors, seen = [], [], 0
+    for line_no, row in parsed_rows:
+        seen += 1
+        if isinstance(row, str):
+            errors.append({"line": line_no, "error": row})
+        else:
+            try:
+                valid.append(validate_row(row))
+            except (TypeError, ValueError) as e:
+                errors.append({"line": line_no, "error": str(e)})
+        if seen == chunk_rows:
+            yield valid, errors
+            valid, errors, seen = [], [], 0
+    if seen:
+        yield valid, errors
+
+
+def stream_csv(df, chunk_rows=CHUNK_ROWS):
+    """Yield `df` as CSV text, `chunk_rows` rows at a time."""
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].to_csv(
+            index=False, header=(start == 0))
+    if len(df) == 0:
+        yield df.to_csv(index=False)
+
+
+def stream_ndjson(df, chunk_rows=CHUNK_ROWS):
+    """Yield `df` as newline-delimited JSON, `chunk_rows` rows at a time."""
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows].to_json(
+            orient="records", lines=True)
+        yield chunk if chunk.endswith("\n") else chunk + "\n"
@@ -0,0 +1,279 @@
+# columnar.py - Memory-mapped columnar copy of a sales CSV
+
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+DATE_COL = "date"
+MANIFEST = "manifest.json"
+FORMAT_VERSION = 1
+
+
+def columnar_dir(csv_path):
+    """Directory holding the columnar copy of `csv_path` (next to the CSV)."""
+    head, tail = os.path.split(csv_path)
+    return os.path.join(head, f".{os.path.splitext(tail)[0]}.columnar")
+
+
+def _csv_signature(csv_path):
+    st = os.stat(csv_path)
+    return {"ino": st.st_ino, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def _save_array(directory, name, arr):
+    # Write then rename: processes that already mapped the old file keep a
+    # valid mapping, new readers see the complete new file.
+    path = os.path.join(directory, f"{name}.npy")
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, arr)
+    os.replace(tmp_path, path)
+
+
+def _append_array(directory, name, values, rows):
+    """
+    Append `values` to an existing 1-D .npy file of `rows` rows in place.
+
+    The data goes after the current end of the file and only then is the
+    header's shape updated (NumPy pads headers so the shape can grow without
+    changing their length), so a concurrent reader sees either the old or
+    the new array. Returns False, touching nothing, if the file cannot be
+    extended this way (e.g. after an earlier append was interrupted).
+    """
+    path = os.path.join(directory, f"{name}.npy")
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            read_header = np.lib.format.read_array_header_1_0
+            write_header = np.lib.format.write_array_header_1_0
+        elif version == (2, 0):
+            read_header = np.lib.format.read_array_header_2_0
+            write_header = np.lib.format.write_array_header_2_0
+        else:
+            return False
+        shape, fortran_order, dtype = read_header(f)
+        header_len = f.tell()
+        if (shape != (rows,) or dtype.hasobject
+                or not np.can_cast(values.dtype, dtype, casting="safe")
+                or os.fstat(f.fileno()).st_size != header_len + shape[0] * dtype.itemsize):
+            return False
+
+        header = io.BytesIO()
+        write_header(header, {"descr": np.lib.format.dtype_to_descr(dtype),
+                              "fortran_order": fortran_order,
+                              "shape": (shape[0] + len(values),)})
+        if header.tell() != header_len:
+            return False
+
+        f.seek(0, os.SEEK_END)
+        f.write(np.ascontiguousarray(values, dtype=dtype).tobytes())
+        f.flush()
+        f.seek(0)
+        f.write(header.getvalue())
+    return True
+
+
+def _write_manifest(directory, manifest):
+    tmp_path = os.path.join(directory, f"{MANIFEST}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp_path, os.path.join(directory, MANIFEST))
+
+
+def _typed_columns(df):
+    """{column: typed array} for a parsed CSV frame, or None if not storable."""
+    if DATE_COL not in df.columns:
+        return None
+    columns = {}
+    for name in df.columns:
+        if name == DATE_COL:
+            dates = pd.to_datetime(df[name], errors="coerce")
+            if dates.isna().any():
+                return None
+            columns[name] = dates.values.astype("datetime64[D]")
+        elif pd.api.types.is_numeric_dtype(df[name]):
+            columns[name] = df[name].to_numpy()
+        else:
+            return None
+    return columns
+
+
+def pivot_sales(dates, stores, values):
+    """
+    Pivot long (date, store, value) arrays into a dates x stores matrix.
+
+    Equivalent to `pivot_table(index=date, columns=store, values=value)` for
+    data with at most one row per (date, store), without building a frame.
+    Missing cells are NaN.
+
+    Returns:
+        (unique_dates, unique_stores, matrix)
+    """
+    unique_dates, date_idx = np.unique(dates, return_inverse=True)
+    unique_stores, store_idx = np.unique(stores, return_inverse=True)
+    matrix = np.full((len(unique_dates), len(unique_stores)), np.nan)
+    matrix[date_idx, store_idx] = values
+    return unique_dates, unique_stores, matrix
+
+
+class ColumnarHistory:
+    """
+    Sales history as typed NumPy arrays, one .npy file per CSV column.
+
+    The date column is stored as datetime64[D]; every other column keeps its
+    numeric dtype. Arrays are opened with mmap_mode='r', so opening costs the
+    same no matter how many rows there are and pages are shared between
+    worker processes. `order` is the permutation that sorts rows by date, or
+    None when the CSV is already sorted.
+
+    A manifest records the inode, size and mtime of the CSV the arrays were built
+    from; `load()` rebuilds them whenever the CSV has changed. Rows appended
+    to the CSV are appended to the arrays in place (`extend()`); arrays are
+    always cut to the manifest's row count, so a reader never sees rows
+    that are still being appended.
+    """
+
+    def __init__(self, columns, order=None):
+        self.columns = columns
+        self.order = order
+
+    def __len__(self):
+        return len(self.columns[DATE_COL])
+
+    @property
+    def dates(self):
+        return self.columns[DATE_COL]
+
+    @classmethod
+    def load(cls, csv_path):
+        """
+        Open the columnar copy of `csv_path`, (re)building it if stale.
+
+        Returns None if the CSV has columns that cannot be stored as typed
+        arrays; callers should fall back to `pd.read_csv`.
+        """
+        directory = columnar_dir(csv_path)
+        try:
+            with open(os.path.join(directory, MANIFEST)) as f:
+                manifest = json.load(f)
+            if (manifest["format"] == FORMAT_VERSION
+                    and manifest["source"] == _csv_signature(csv_path)):
+                return cls.open(directory)
+        except (OSError, ValueError, KeyError):
+            pass
+        return cls.from_frame(pd.read_csv(csv_path), csv_path)
+
+    @classmethod
+    def open(cls, directory):
+        """Memory-map an existing columnar directory."""
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        rows = manifest["rows"]
+        columns = {
+            name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")[:rows]
+            for name in manifest["columns"]
+        }
+        order = None
+        if not manifest["sorted"]:
+            order = np.load(os.path.join(directory, "_order.npy"), mmap_mode="r")
+        return cls(columns, order)
+
+    @classmethod
+    def from_frame(cls, df, csv_path):
+        """
+        Write `df` (the parsed contents of `csv_path`) as a columnar copy.
+
+        Must be called after the CSV itself has been written so the manifest
+        records the right signature. Returns None if `df` is not storable.
+        """
+        columns = _typed_columns(df)
+        if columns is None:
+            return None
+
+        directory = columnar_dir(csv_path)
+        os.makedirs(directory, exist_ok=True)
+        for name, arr in columns.items():
+            _save_array(directory, name, arr)
+
+        dates = columns[DATE_COL]
+        is_sorted = bool(np.all(dates[1:] >= dates[:-1]))
+        if not is_sorted:
+            _save_array(directory, "_order", np.argsort(dates, kind="stable"))
+
+        manifest = {
+            "format": FORMAT_VERSION,
+            "columns": list(columns),
+            "rows": len(df),
+            "sorted": is_sorted,
+            "source": _csv_signature(csv_path),
+        }
+        _write_manifest(directory, manifest)
+        return cls.open(directory)
+
+    def extend(self, rows, csv_path):
+        """
+        Append `rows` (a frame with this history's columns, already appended
+        to `csv_path`) to the columnar copy in place - O(len(rows)) rather
+        than a rebuild.
+
+        Returns the reopened history, or None if the rows cannot be appended
+        in place (different columns or incompatible dtypes, or dates that
+        would leave the history unsorted); the caller then rebuilds with
+        `from_frame`.
+        """
+        directory = columnar_dir(csv_path)
+        with open(os.path.join(directory, MANIFEST)) as f:
+            manifest = json.load(f)
+        if list(rows.columns) != manifest["columns"] or manifest["rows"] != len(self):
+            return None
+        columns = _typed_columns(rows)
+        if columns is None:
+            return None
+        new_dates = columns[DATE_COL]
+        if not manifest["sorted"] or not np.all(new_dates[1:] >= new_dates[:-1]):
+            return None
+        if len(self) and len(new_dates) and new_dates[0] < self.dates[-1]:
+            return None
+        if any(not np.can_cast(arr.dtype, self.columns[name].dtype, casting="safe")
+               for name, arr in columns.items()):
+            return None
+
+        # If a column refuses after others were extended, the manifest still
+        # holds the old row count, so readers ignore the extra rows and the
+        # caller's rebuild replaces every file
+        for name, arr in columns.items():
+            if not _append_array(directory, name, arr, manifest["rows"]):
+                return None
+        manifest["rows"] += len(rows)
+        manifest["source"] = _csv_signature(csv_path)
+        _write_manifest(directory, manifest)
+        return self.open(directory)
+
+    def to_frame(self):
+        """Rebuild the CSV-shaped frame (dates as ISO strings, CSV row order)."""
+        data = {}
+        for name, arr in self.columns.items():
+            if name == DATE_COL:
+                # Format each distinct day once; rows share the string objects
+                days, inverse = np.unique(arr, return_inverse=True)
+                data[name] = np.datetime_as_string(days, unit="D").astype(object)[inverse]
+            else:
+                data[name] = arr
+        return pd.DataFrame(data)
+
+    def daily_frame(self, value_col="sales"):
+        """
+        Daily totals of `value_col` across stores as a ['date', value_col]
+        frame, sorted by date - the standalone forecaster's training series.
+        """
+        dates, values = self.dates, self.columns[value_col]
+        if self.order is not None:
+            dates, values = dates[self.order], values[self.order]
+        if len(dates):
+            starts = np.flatnonzero(np.r_[True, dates[1:] != dates[:-1]])
+            if len(starts) < len(dates):
+                dates, values = dates[starts], np.add.reduceat(values.astype(float), starts)
+        return pd.DataFrame({DATE_COL: dates.astype("datetime64[ns]"), value_col: values})
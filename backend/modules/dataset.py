@@ -0,0 +1,356 @@
+# dataset.py - Process-wide in-memory sales dataset with write-through
+
+import hashlib
+import os
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+
+from modules.columnar import ColumnarHistory
+from modules.metrics import timed
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking (dev server only)
+    fcntl = None
+
+
+def _concat_rows(df, df_new):
+    """
+    df followed by df_new, keeping df's column order.
+
+    When df has no rows - a header-only CSV, which pandas reads with every
+    column as object - the new rows' dtypes are kept instead, so numeric
+    columns stay numeric (and storable columnar) from the first row on.
+    """
+    if len(df):
+        return pd.concat([df, df_new], ignore_index=True)
+    columns = list(df.columns) + [c for c in df_new.columns if c not in df.columns]
+    return df_new.reindex(columns=columns).reset_index(drop=True)
+
+
+class ReadWriteLock:
+    """
+    Reader/writer lock: any number of concurrent readers or a single writer.
+
+    Writers are preferred - once a writer is waiting, new readers block until
+    it has finished, so a steady stream of GETs cannot starve an edit.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    def acquire_read(self):
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+
+    def release_read(self):
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self):
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+
+    def release_write(self):
+        with self._cond:
+            self._writer = False
+            self._cond.notify_all()
+
+    @contextmanager
+    def read_locked(self):
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write_locked(self):
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
+
+
+class SalesDataset:
+    """
+    Parsed sales history held in memory and shared by all request handlers.
+
+    The CSV is parsed once; every mutation runs under the write lock, builds a
+    new frame, writes it through to disk and bumps `version`. Frames handed
+    out by `read()` are never modified in place, so callers may use them
+    after the lock is released but must not mutate them.
+
+    Subscribers registered with `subscribe()` are called with the new version
+    after each committed change (outside the lock). Observers registered with
+    `observe()` receive the changed rows themselves, inside the lock, so
+    derived state such as rollups can be maintained incrementally in step
+    with the data.
+
+    A memory-mapped ColumnarHistory copy is kept next to the CSV - extended
+    in place on appends, rebuilt when rows are edited or deleted - so a
+    process starting up maps typed arrays instead of parsing the CSV text.
+
+    Several processes (gunicorn workers) may share one CSV. Writers also take
+    an exclusive flock on `<csv>.lock` and reload first if another process
+    changed the file; readers reload whenever the file's inode/size/mtime no
+    longer match what this process last loaded or wrote.
+    """
+
+    def __init__(self, csv_path):
+        self.csv_path = csv_path
+        self._lock = ReadWriteLock()
+        self._df = None
+        self._history = None
+        self._signature = None
+        self._lock_path = f"{csv_path}.lock"
+        self._version = 0
+        self._subscribers = []
+        self._observers = []
+
+    @property
+    def version(self):
+        """Version as of this process's last load or commit (no disk check)."""
+        return self._version
+
+    def load(self):
+        """(Re)load the dataset from disk."""
+        with self._lock.write_locked(), self._file_locked(exclusive=False):
+            version = self._load()
+        self._notify(version)
+        return self
+
+    @contextmanager
+    def _file_locked(self, exclusive):
+        # Inter-process lock; the in-process ReadWriteLock must be held too
+        if fcntl is None:
+            yield
+            return
+        with open(self._lock_path, "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _disk_signature(self):
+        try:
+            st = os.stat(self.csv_path)
+        except FileNotFoundError:
+            return None
+        # Rewrites replace the file (new inode); appends change its size
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _load(self):
+        # Caller holds the write lock and the file lock
+        with timed("csv_load"):
+            self._history = ColumnarHistory.load(self.csv_path)
+            if self._history is not None:
+                self._df = self._history.to_frame()
+            else:
+                self._df = pd.read_csv(self.csv_path)
+        self._signature = self._disk_signature()
+        for observer in self._observers:
+            observer.reset(self._df)
+        self._version += 1
+        return self._version
+
+    def _sync(self):
+        # Caller holds the write lock and the exclusive file lock. Pick up
+        # changes another process made before modifying anything.
+        if self._df is None or self._disk_signature() != self._signature:
+            self._load()
+
+    def _refresh(self):
+        """Reload if another process changed the CSV since we last saw it."""
+        if self._df is not None and self._disk_signature() == self._signature:
+            return
+        with self._lock.write_locked(), self._file_locked(exclusive=False):
+            if self._df is not None and self._disk_signature() == self._signature:
+                return
+            version = self._load()
+        self._notify(version)
+
+    def read(self):
+        """
+        Return (df, version) for a consistent snapshot of the dataset.
+
+        The returned frame is shared - treat it as read-only.
+        """
+        self._refresh()
+        with self._lock.read_locked():
+            if self._df is None:
+                raise RuntimeError(f"Dataset {self.csv_path} is not loaded")
+            return self._df, self._version
+
+    def tag(self):
+        """
+        Content tag of the current data, for HTTP validators.
+
+        Unlike `version`, which counts loads and commits per process, the
+        tag comes from the CSV's inode/size/mtime as last loaded or written,
+        so every process sharing the file agrees on it.
+        """
+        self._refresh()
+        with self._lock.read_locked():
+            return hashlib.md5(repr(self._signature).encode()).hexdigest()[:16]
+
+    def __len__(self):
+        df, _ = self.read()
+        return len(df)
+
+    def subscribe(self, callback):
+        """Register callback(version) to run after each committed change."""
+        self._subscribers.append(callback)
+
+    def observe(self, observer):
+        """
+        Register an observer with `reset(df)` and `apply(added, removed)`.
+
+        `reset` is called with the full frame on (re)load - immediately if the
+        dataset is already loaded; `apply` is called with the added and
+        removed rows (either may be empty) of every committed change.
+        """
+        with self._lock.write_locked():
+            self._observers.append(observer)
+            if self._df is not None:
+                observer.reset(self._df)
+
+    def append(self, rows):
+        """Append a list of row dicts. Returns the index of the first new row."""
+        df_new = pd.DataFrame(rows)
+        with self._lock.write_locked(), self._file_locked(exclusive=True):
+            self._sync()
+            start_index = len(self._df)
+            df = _concat_rows(self._df, df_new)
+            if set(df_new.columns) <= set(self._df.columns):
+                version = self._commit(df, appended=df_new)
+            else:
+                version = self._commit(df)
+            self._apply(added=df_new)
+        self._notify(version)
+        return start_index
+
+    def update(self, index, values):
+        """
+        Set the given columns of row `index`; unknown keys are ignored.
+
+        Returns False if the index is out of range.
+        """
+        with self._lock.write_locked(), self._file_locked(exclusive=True):
+            self._sync()
+            if index < 0 or index >= len(self._df):
+                return False
+            df = self._df.copy()
+            for key, value in values.items():
+                if key in df.columns:
+                    df.at[index, key] = value
+            removed = self._df.iloc[[index]]
+            version = self._commit(df)
+            self._apply(added=df.iloc[[index]], removed=removed)
+        self._notify(version)
+        return True
+
+    def delete(self, index):
+        """Delete row `index`. Returns False if the index is out of range."""
+        with self._lock.write_locked(), self._file_locked(exclusive=True):
+            self._sync()
+            if index < 0 or index >= len(self._df):
+                return False
+            removed = self._df.iloc[[index]]
+            df = self._df.drop(index).reset_index(drop=True)
+            version = self._commit(df)
+            self._apply(removed=removed)
+        self._notify(version)
+        return True
+
+    def _commit(self, df, appended=None):
+        # Caller holds the write lock and the exclusive file lock. Rows that
+        # only extend the existing columns are appended to the CSV; anything
+        # else rewrites it via a temp file and rename so a crash never leaves
+        # a truncated CSV behind.
+        if appended is not None:
+            appended = appended.reindex(columns=self._df.columns)
+            appended.to_csv(self.csv_path, mode="a", header=False, index=False)
+        else:
+            tmp_path = f"{self.csv_path}.tmp"
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, self.csv_path)
+        self._signature = self._disk_signature()
+        history = None
+        if appended is not None and self._history is not None:
+            history = self._history.extend(appended, self.csv_path)
+        if history is None:
+            history = ColumnarHistory.from_frame(df, self.csv_path)
+        self._history = history
+        self._df = df
+        self._version += 1
+        return self._version
+
+    def _apply(self, added=None, removed=None):
+        # Caller holds the write lock
+        added = added if added is not None else self._df.iloc[0:0]
+        removed = removed if removed is not None else self._df.iloc[0:0]
+        for observer in self._observers:
+            observer.apply(added, removed)
+
+    def _notify(self, version):
+        for callback in self._subscribers:
+            callback(version)
+
+
+class VersionedCache:
+    """
+    Memoizes results computed from a SalesDataset.
+
+    Entries are tagged with the dataset version they were computed from and
+    the whole cache is dropped when the dataset changes, so a hit is always
+    consistent with the current data.
+    """
+
+    def __init__(self, dataset):
+        self._dataset = dataset
+        self._lock = threading.Lock()
+        self._entries = {}
+        dataset.subscribe(self._invalidate)
+
+    def get_or_compute(self, key, compute, refresh=False):
+        """
+        Return the cached value for `key`, or compute(df) and cache it.
+
+        With `refresh`, compute(df) runs even if a value is cached.
+        """
+        df, version = self._dataset.read()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version and not refresh:
+                return entry[1]
+
+        value = compute(df)
+
+        with self._lock:
+            # Only keep the result if nothing changed while we were computing
+            if self._dataset.version == version:
+                self._entries[key] = (version, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _invalidate(self, version):
+        self.clear()
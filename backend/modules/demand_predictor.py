@@ -1,9 +1,15 @@
 import pandas as pd
 import numpy as np
-import lightgbm as lgb
-from sklearn.metrics import mean_absolute_error, mean_squared_error
-from sklearn.model_selection import TimeSeriesSplit
-from typing import List, Tuple, Dict, Any
+from typing import TYPE_CHECKING, List, Tuple, Dict, Any, Optional
+from modules.columnar import ColumnarHistory
+from modules.features import calendar_features, lag_roll_features
+from modules.metrics import timed
+from modules.model_cache import ModelCache, series_fingerprint
+
+# lightgbm is imported inside train_model so importing this module (and the
+# app) stays cheap; see warm_up() in app.py for preloading it in production.
+if TYPE_CHECKING:
+    import lightgbm as lgb
 
 TARGET = "sales"
 DATE_COL = "date"
@@ -12,51 +18,57 @@ SEED = 42
 LAGS = [1, 7, 14, 28, 56, 91, 182, 365]
 ROLLS = [7, 14, 28, 56]
 
-def create_date_features(df: pd.DataFrame) -> pd.DataFrame:
-    """Generate date-related features capturing seasonality and holidays."""
-    df["dow"] = df[DATE_COL].dt.weekday
-    df["week"] = df[DATE_COL].dt.isocalendar().week.astype(int)
-    df["month"] = df[DATE_COL].dt.month
-    df["day"] = df[DATE_COL].dt.day
-    df["quarter"] = df[DATE_COL].dt.quarter
-    df["is_weekend"] = (df["dow"] >= 5).astype(int)
-    df["year"] = df[DATE_COL].dt.year
-    df["dayofyear"] = df[DATE_COL].dt.dayofyear
-    df["sin_day"] = np.sin(2 * np.pi * df["dayofyear"] / 365)
-    df["cos_day"] = np.cos(2 * np.pi * df["dayofyear"] / 365)
-    return df
-
-def add_lags_rolls(df: pd.DataFrame, lags: List[int], rolls: List[int]) -> pd.DataFrame:
-    """Add lag and rolling window features."""
-    df = df.copy()
-    for lag in lags:
-        df[f"lag_{lag}"] = df[TARGET].shift(lag)
-    for r in rolls:
-        df[f"roll_mean_{r}"] = df[TARGET].shift(1).rolling(r).mean()
-        df[f"roll_std_{r}"] = df[TARGET].shift(1).rolling(r).std()
-    return df
+def build_features(df: pd.DataFrame, lags: List[int], rolls: List[int]) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Add date, lag and rolling window features to a gap-free daily frame.
+
+    Calendar features come from a per-date lookup table and lag/rolling
+    features from one vectorized pass (see modules/features.py); all
+    columns are added with a single concat.
+    """
+    features = calendar_features(df[DATE_COL].to_numpy())
+    lagged = lag_roll_features(df[TARGET].to_numpy(dtype=float)[None, :], lags, rolls)
+    features.update((name, values[0]) for name, values in lagged.items())
+    df = pd.concat(
+        [df.drop(columns=[c for c in features if c in df.columns]),
+         pd.DataFrame(features, index=df.index)],
+        axis=1)
+    return df, list(lagged)
+
+def load_history(csv_path: str) -> pd.DataFrame:
+    """Load the sales history from a CSV file."""
+    with timed("csv_load"):
+        history = ColumnarHistory.load(csv_path)
+        if history is None:
+            return pd.read_csv(csv_path)
+    # Per-store files are summed to one series per day
+    return history.daily_frame(TARGET)
 
 def load_and_prepare_data(csv_path: str) -> Tuple[pd.DataFrame, List[str]]:
     """Load and prepare data for training."""
-    df = pd.read_csv(csv_path)
-    df[DATE_COL] = pd.to_datetime(df[DATE_COL])
+    return prepare_data(load_history(csv_path))
+
+@timed("feature_build")
+def prepare_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, List[str]]:
+    """Prepare an already loaded sales frame for training (input is not modified)."""
+    df = df.assign(**{DATE_COL: pd.to_datetime(df[DATE_COL])})
     df = df.sort_values(DATE_COL).reset_index(drop=True)
     
     full_idx = pd.date_range(df[DATE_COL].min(), df[DATE_COL].max(), freq="D")
-    df = df.set_index(DATE_COL).reindex(full_idx).rename_axis(DATE_COL).fillna(method="ffill").reset_index()
+    df = df.set_index(DATE_COL).reindex(full_idx).rename_axis(DATE_COL).ffill().reset_index()
     
-    df = create_date_features(df)
-    df = add_lags_rolls(df, LAGS, ROLLS)
-    
-    lag_cols = [c for c in df.columns if c.startswith(("lag_", "roll_"))]
+    df, lag_cols = build_features(df, LAGS, ROLLS)
     df = df.dropna(subset=lag_cols).reset_index(drop=True)
     
     df["y"] = np.log1p(df[TARGET])
     
     return df, lag_cols
 
-def train_model(df: pd.DataFrame, lag_cols: List[str]) -> Tuple[lgb.Booster, List[str]]:
+@timed("train_model")
+def train_model(df: pd.DataFrame, lag_cols: List[str]) -> Tuple["lgb.Booster", List[str]]:
     """Train the LightGBM model."""
+    import lightgbm as lgb
+
     FEATURES = [
         "dow", "week", "month", "day", "quarter", "is_weekend", "year",
         "sin_day", "cos_day"
@@ -99,8 +111,9 @@ def train_model(df: pd.DataFrame, lag_cols: List[str]) -> Tuple[lgb.Booster, Lis
     
     return bst, FEATURES
 
+@timed("recursive_forecast")
 def recursive_forecast(
-    model: lgb.Booster,
+    model: "lgb.Booster",
     df_recent: pd.DataFrame,
     features: List[str],
     horizon: int = 90,
@@ -108,22 +121,13 @@ def recursive_forecast(
     """Generate recursive forecasts for the specified horizon."""
     preds, history = [], list(df_recent[TARGET])
     current_date = df_recent[DATE_COL].iloc[-1]
+    future_dates = pd.date_range(current_date + pd.Timedelta(days=1), periods=horizon, freq="D")
+    calendar = calendar_features(future_dates.to_numpy())
 
     for step in range(1, horizon + 1):
         next_date = current_date + pd.Timedelta(days=1)
-        row = {
-            DATE_COL: next_date,
-            "dow": next_date.weekday(),
-            "week": int(next_date.isocalendar()[1]),
-            "month": next_date.month,
-            "day": next_date.day,
-            "quarter": next_date.quarter,
-            "is_weekend": int(next_date.weekday() >= 5),
-            "year": next_date.year,
-            "dayofyear": next_date.timetuple().tm_yday,
-            "sin_day": np.sin(2 * np.pi * next_date.timetuple().tm_yday / 365),
-            "cos_day": np.cos(2 * np.pi * next_date.timetuple().tm_yday / 365),
-        }
+        row = {DATE_COL: next_date}
+        row.update((col, values[step - 1]) for col, values in calendar.items())
         for lag in LAGS:
             row[f"lag_{lag}"] = history[-lag] if lag <= len(history) else np.nan
         for r in ROLLS:
@@ -139,22 +143,80 @@ def recursive_forecast(
 
     return pd.DataFrame(preds)
 
-def get_demand_forecast(csv_path: str, horizon: int = 90) -> List[Dict[str, Any]]:
+def _trained_model(
+    df: pd.DataFrame,
+    model_cache: Optional[ModelCache],
+    component_id: str,
+) -> Tuple["lgb.Booster", List[str], pd.DataFrame]:
+    """(model, features, prepared df) for a loaded history, cached or trained."""
+    cached = None
+    if model_cache is not None:
+        fingerprint = series_fingerprint(df)
+        cached = model_cache.get(component_id, fingerprint)
+    if cached is not None:
+        return cached
+
+    # Prepare data and train model
+    df, lag_cols = prepare_data(df)
+    model, features = train_model(df, lag_cols)
+    if model_cache is not None:
+        model_cache.put(component_id, fingerprint, model, features, df)
+    return model, features, df
+
+def holdout_residuals(model: "lgb.Booster", df: pd.DataFrame, features: List[str]) -> np.ndarray:
+    """
+    Log-scale errors y - prediction over the days the model was not trained
+    on (the validation and test periods of train_model), in date order.
+    """
+    last_date = df[DATE_COL].max()
+    holdout_start = last_date - pd.Timedelta(days=2 * HORIZON - 1)
+    holdout = df[df[DATE_COL] >= holdout_start]
+    pred = model.predict(holdout[features], num_iteration=model.best_iteration)
+    return holdout["y"].to_numpy(dtype=float) - pred
+
+def get_forecast_residuals(
+    csv_path: Optional[str] = None,
+    df: Optional[pd.DataFrame] = None,
+    model_cache: Optional[ModelCache] = None,
+    component_id: str = "default",
+) -> np.ndarray:
+    """
+    Out-of-sample residuals of the forecast model, for simulating demand
+    as forecast plus realistic error (see scenarios.residual_scenarios).
+    Arguments as for get_demand_forecast; the model is shared with it
+    through model_cache.
+    """
+    if df is None:
+        df = load_history(csv_path)
+    model, features, df = _trained_model(df, model_cache, component_id)
+    return holdout_residuals(model, df, features)
+
+def get_demand_forecast(
+    csv_path: Optional[str] = None,
+    horizon: int = 90,
+    df: Optional[pd.DataFrame] = None,
+    model_cache: Optional[ModelCache] = None,
+    component_id: str = "default",
+) -> List[Dict[str, Any]]:
     """
     Main function to generate demand forecast.
     
     Args:
         csv_path: Path to the CSV file containing historical sales data
         horizon: Number of days to forecast (default: 90)
+        df: Already loaded sales history; used instead of csv_path if given
+        model_cache: Optional ModelCache; the trained model and prepared
+            features are reused while the history is unchanged
+        component_id: Key of this history in model_cache
     
     Returns:
         List of dictionaries with date and demand predictions.
     """
-    # Load and prepare data
-    df, lag_cols = load_and_prepare_data(csv_path)
-    
-    # Train model
-    model, features = train_model(df, lag_cols)
+    # Load data
+    if df is None:
+        df = load_history(csv_path)
+
+    model, features, df = _trained_model(df, model_cache, component_id)
     
     # Generate forecast
     forecast_df = recursive_forecast(model, df, features, horizon)
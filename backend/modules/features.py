@@ -0,0 +1,153 @@
+# features.py - Vectorized calendar, lag and rolling-window features
+
+import threading
+
+import numpy as np
+
+# Calendar columns, in the order the forecaster uses them
+CALENDAR_COLUMNS = ("dow", "week", "month", "day", "quarter", "is_weekend",
+                    "year", "dayofyear", "sin_day", "cos_day")
+
+# Days added around a requested range when the calendar table is (re)built,
+# so later requests - e.g. forecast horizons - usually hit the cached table
+_CALENDAR_PAD_DAYS = 400
+
+_calendar_lock = threading.Lock()
+_calendar = None  # (first_day, {column: array indexed by day - first_day})
+
+
+def _build_calendar(first_day, last_day):
+    """Calendar columns for every day in [first_day, last_day] (day numbers)."""
+    days = np.arange(first_day, last_day + 1)
+    dates = days.astype("datetime64[D]")
+    years = dates.astype("datetime64[Y]")
+    months = dates.astype("datetime64[M]")
+
+    year = years.astype(np.int64) + 1970
+    month = (months - years.astype("datetime64[M]")).astype(np.int64) + 1
+    day = (dates - months.astype("datetime64[D]")).astype(np.int64) + 1
+    dayofyear = (dates - years.astype("datetime64[D]")).astype(np.int64) + 1
+    # 1970-01-01 was a Thursday; Monday = 0
+    dow = (days + 3) % 7
+
+    # ISO week: weeks belong to the ISO year of their Thursday
+    thursday = (days - dow + 3).astype("datetime64[D]")
+    iso_year_start = thursday.astype("datetime64[Y]").astype("datetime64[D]")
+    week = (thursday - iso_year_start).astype(np.int64) // 7 + 1
+
+    return {
+        "dow": dow,
+        "week": week,
+        "month": month,
+        "day": day,
+        "quarter": (month - 1) // 3 + 1,
+        "is_weekend": (dow >= 5).astype(np.int64),
+        "year": year,
+        "dayofyear": dayofyear,
+        "sin_day": np.sin(2 * np.pi * dayofyear / 365),
+        "cos_day": np.cos(2 * np.pi * dayofyear / 365),
+    }
+
+
+def calendar_features(dates):
+    """
+    Calendar features for an array of dates: {column: 1-D array}.
+
+    Values come from a process-wide lookup table with one row per calendar
+    day, computed once with NumPy date arithmetic and extended when a date
+    falls outside it; each call is then a single gather per column.
+    """
+    global _calendar
+    day_numbers = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    if len(day_numbers) == 0:
+        return {col: np.empty(0) for col in CALENDAR_COLUMNS}
+    lo, hi = int(day_numbers.min()), int(day_numbers.max())
+
+    with _calendar_lock:
+        table = _calendar
+        if table is None or lo < table[0] or hi >= table[0] + len(table[1]["dow"]):
+            if table is not None:
+                lo = min(lo, table[0])
+                hi = max(hi, table[0] + len(table[1]["dow"]) - 1)
+            first_day = lo - _CALENDAR_PAD_DAYS
+            table = _calendar = (first_day, _build_calendar(first_day, hi + _CALENDAR_PAD_DAYS))
+
+    first_day, columns = table
+    positions = day_numbers - first_day
+    return {col: columns[col][positions] for col in CALENDAR_COLUMNS}
+
+
+def _cumsum(values):
+    """Cumulative sums along days with a leading zero column."""
+    cumsum = np.zeros((values.shape[0], values.shape[1] + 1))
+    np.cumsum(values, axis=1, out=cumsum[:, 1:])
+    return cumsum
+
+
+def _window_sums(cumsum, window):
+    """Sums over values[:, t-window:t] for every t, NaN where not available."""
+    length = cumsum.shape[1] - 1
+    sums = np.full((cumsum.shape[0], length), np.nan)
+    sums[:, window:] = cumsum[:, window:length] - cumsum[:, :length - window]
+    return sums
+
+
+def lag_roll_features(values, lags, rolls):
+    """
+    Lag and trailing rolling-window features for many series at once.
+
+    `values` is a 2-D array (series x days) of consecutive daily values with
+    no gaps. Returns {name: 2-D array} with lag_<k> = value k days earlier
+    and roll_mean_<r> / roll_std_<r> = mean and sample std (ddof=1) of the r
+    days before each day - the same as pandas' shift(k) and
+    shift(1).rolling(r).mean()/.std(). Windows that reach before the start
+    of the series, or contain a NaN, are NaN.
+
+    Rolling statistics come from one cumulative sum of the values, their
+    squares and a NaN count per series - O(days) regardless of window size.
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim != 2:
+        raise ValueError("values must be a 2-D array (series x days)")
+    n_series, length = values.shape
+    features = {}
+
+    for lag in lags:
+        lagged = np.full((n_series, length), np.nan)
+        if lag < length:
+            lagged[:, lag:] = values[:, :length - lag]
+        features[f"lag_{lag}"] = lagged
+
+    missing = np.isnan(values)
+    present = np.maximum((~missing).sum(axis=1, keepdims=True), 1)
+    # Centre each series on its rounded mean: the variance formula below
+    # subtracts two large numbers, and centring keeps them small. A whole
+    # number offset keeps integer sales integral, so every window sum is
+    # exact and equal windows give bit-identical features.
+    offset = np.round(np.where(missing, 0.0, values).sum(axis=1, keepdims=True) / present)
+    centred = np.where(missing, 0.0, values - offset)
+    sum_cs = _cumsum(centred)
+    square_cs = _cumsum(centred ** 2)
+    missing_cs = _cumsum(missing.astype(float))
+
+    for r in rolls:
+        if r > length:
+            features[f"roll_mean_{r}"] = np.full((n_series, length), np.nan)
+            features[f"roll_std_{r}"] = np.full((n_series, length), np.nan)
+            continue
+        sums = _window_sums(sum_cs, r)
+        square_sums = _window_sums(square_cs, r)
+        incomplete = _window_sums(missing_cs, r) > 0
+        mean = (sums + r * offset) / r
+        if r > 1:
+            var = (r * square_sums - sums ** 2) / (r * (r - 1))
+            std = np.sqrt(np.maximum(var, 0.0))
+        else:
+            # Sample std of a single value is undefined, as in pandas
+            std = np.full((n_series, length), np.nan)
+        mean[incomplete] = np.nan
+        std[incomplete] = np.nan
+        features[f"roll_mean_{r}"] = mean
+        features[f"roll_std_{r}"] = std
+
+    return features
@@ -0,0 +1,234 @@
+# metrics.py - Per-stage latency histograms and per-request stage timings
+
+import json
+import os
+import threading
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+# Histogram bucket upper bounds in seconds; stages range from sub-millisecond
+# lookups to multi-minute grid searches
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+# Stage durations recorded during the current request: list of (stage, secs)
+_request_timings = ContextVar("request_timings", default=None)
+
+# Set by enable_multiprocess(): the directory every process writes its
+# histograms to, and this process's file in it
+_multiprocess_dir = None
+_process_file = None
+_flush_lock = threading.Lock()
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help_text, label_names, buckets=BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        # labels -> [bucket counts..., sum, count]
+        self._series = {}
+
+    def observe(self, labels, seconds):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series[i] += 1
+            series[-2] += seconds
+            series[-1] += 1
+
+    def snapshot(self):
+        """{labels: [bucket counts..., sum, count]} copy of every series."""
+        with self._lock:
+            return {labels: list(series) for labels, series in self._series.items()}
+
+    def reset(self):
+        with self._lock:
+            self._series = {}
+
+    def render(self, series_by_labels=None):
+        """
+        Prometheus text exposition lines for this histogram, or for
+        `series_by_labels` (e.g. merged from several processes) if given.
+        """
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        if series_by_labels is None:
+            series_by_labels = self.snapshot()
+        for labels, series in sorted(series_by_labels.items()):
+            label_str = ",".join(
+                f'{name}="{value}"' for name, value in zip(self.label_names, labels))
+            sep = "," if label_str else ""
+            for bound, count in zip(self.buckets, series):
+                lines.append(f'{self.name}_bucket{{{label_str}{sep}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{label_str}{sep}le="+Inf"}} {series[-1]}')
+            lines.append(f"{self.name}_sum{{{label_str}}} {series[-2]}")
+            lines.append(f"{self.name}_count{{{label_str}}} {series[-1]}")
+        return lines
+
+
+STAGE_DURATION = Histogram(
+    "aura_stage_duration_seconds",
+    "Time spent in each forecasting/optimization pipeline stage.",
+    ("stage",))
+
+REQUEST_DURATION = Histogram(
+    "aura_http_request_duration_seconds",
+    "HTTP request latency by endpoint.",
+    ("endpoint", "method", "status"))
+
+HISTOGRAMS = (STAGE_DURATION, REQUEST_DURATION)
+
+
+class timed(ContextDecorator):
+    """
+    Time a block or function as pipeline stage `stage`.
+
+        with timed("csv_load"): ...
+
+        @timed("train_model")
+        def train_model(...): ...
+
+    The duration goes into the stage histogram and, inside a request started
+    with `start_request()`, into that request's Server-Timing breakdown.
+    """
+
+    def __init__(self, stage):
+        self.stage = stage
+        self._starts = threading.local()
+
+    def __enter__(self):
+        stack = getattr(self._starts, "stack", None)
+        if stack is None:
+            stack = self._starts.stack = []
+        stack.append(time.perf_counter())
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self._starts.stack.pop()
+        STAGE_DURATION.observe((self.stage,), elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((self.stage, elapsed))
+        else:
+            # Background work: no request end to flush at
+            flush()
+        return False
+
+
+def start_request():
+    """Begin collecting stage timings for the current request."""
+    _request_timings.set([])
+
+
+def finish_request(endpoint, method, status, seconds):
+    """
+    Record the request latency and return its Server-Timing header value.
+
+    Repeated stages (e.g. one scenario generation per grid point) are summed.
+    """
+    REQUEST_DURATION.observe((endpoint, method, str(status)), seconds)
+    flush()
+    totals = {}
+    for stage, elapsed in _request_timings.get() or []:
+        totals[stage] = totals.get(stage, 0.0) + elapsed
+    _request_timings.set(None)
+    parts = [f"{stage};dur={elapsed * 1000:.1f}" for stage, elapsed in totals.items()]
+    parts.append(f"total;dur={seconds * 1000:.1f}")
+    return ", ".join(parts)
+
+
+def enable_multiprocess(directory, reset=False):
+    """
+    Share metrics between the processes of one server (gunicorn master and
+    workers) through `directory`.
+
+    Each process writes its histograms to <directory>/<pid>.json after every
+    request (and after background stages) and render_prometheus() sums the
+    files of all processes, so every scrape sees the whole server. Files of
+    exited workers are kept, so totals never go backwards; clear the
+    directory with clear_multiprocess_dir() before the server starts.
+
+    `reset` drops series inherited through fork - they belong to the parent,
+    which reports them in its own file.
+    """
+    global _multiprocess_dir, _process_file
+    if reset:
+        for histogram in HISTOGRAMS:
+            histogram.reset()
+    os.makedirs(directory, exist_ok=True)
+    _multiprocess_dir = directory
+    _process_file = os.path.join(directory, f"{os.getpid()}.json")
+    flush()
+
+
+def clear_multiprocess_dir(directory):
+    """Remove the metric files of a previous server run."""
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith(".json") or name.endswith(".tmp"):
+            os.remove(os.path.join(directory, name))
+
+
+def flush():
+    """Write this process's histograms to its shared file, if enabled."""
+    if _process_file is None:
+        return
+    # Serialized, so an older snapshot can never replace a newer one
+    with _flush_lock:
+        data = {
+            histogram.name: [[list(labels), series]
+                             for labels, series in histogram.snapshot().items()]
+            for histogram in HISTOGRAMS
+        }
+        tmp_path = f"{_process_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, _process_file)
+
+
+def _merged_series():
+    # {histogram name: {labels: summed series}} over every process's file
+    merged = {histogram.name: {} for histogram in HISTOGRAMS}
+    for name in os.listdir(_multiprocess_dir):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(_multiprocess_dir, name)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for histogram_name, items in data.items():
+            target = merged.get(histogram_name)
+            if target is None:
+                continue
+            for labels, series in items:
+                labels = tuple(labels)
+                total = target.get(labels)
+                if total is None:
+                    target[labels] = list(series)
+                else:
+                    target[labels] = [a + b for a, b in zip(total, series)]
+    return merged
+
+
+def render_prometheus():
+    """All metrics in Prometheus text format, summed over processes if shared."""
+    if _multiprocess_dir is None:
+        lines = [line for histogram in HISTOGRAMS for line in histogram.render()]
+    else:
+        flush()
+        merged = _merged_series()
+        lines = [line for histogram in HISTOGRAMS
+                 for line in histogram.render(merged[histogram.name])]
+    return "\n".join(lines) + "\n"
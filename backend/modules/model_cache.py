@@ -0,0 +1,134 @@
+# model_cache.py - Memory-bounded LRU of trained forecasters, persisted per component
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+from modules.names import is_safe_name
+
+MODEL_FILE = "model.txt"
+FEATURES_FILE = "features.pkl"
+META_FILE = "meta.json"
+
+
+def series_fingerprint(df):
+    """
+    Content hash of a ['date', 'sales'] training series.
+
+    Stable across processes and restarts (unlike dataset versions), so a
+    model saved by one worker is reused by the others.
+    """
+    digest = hashlib.md5()
+    digest.update(pd.to_datetime(df["date"]).to_numpy().astype("datetime64[D]").tobytes())
+    digest.update(pd.to_numeric(df["sales"]).to_numpy(dtype=float).tobytes())
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """
+    Trained boosters and their prepared feature frames, per component.
+
+    Every entry is written to `<model_dir>/<component_id>/<fingerprint>/`
+    when it is put, and held in memory in LRU order until the estimated
+    size of all held entries exceeds `max_bytes`. An evicted (or never loaded) entry is read
+    back from disk on the next `get` - far cheaper than retraining - as long
+    as the training series still has the same fingerprint. Only the latest
+    model per component is kept on disk.
+    """
+
+    def __init__(self, model_dir, max_bytes):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        # component_id -> (fingerprint, (booster, features, prepared), nbytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+    def _dir(self, component_id):
+        if not is_safe_name(component_id):
+            raise ValueError(f"Invalid component id: {component_id!r}")
+        return os.path.join(self.model_dir, component_id)
+
+    def get(self, component_id, fingerprint):
+        """(booster, features, prepared_df) trained on `fingerprint`, or None."""
+        with self._lock:
+            entry = self._entries.get(component_id)
+            if entry is not None and entry[0] == fingerprint:
+                self._entries.move_to_end(component_id)
+                return entry[1]
+
+        value = self._load(component_id, fingerprint)
+        if value is not None:
+            self._hold(component_id, fingerprint, value)
+        return value
+
+    def put(self, component_id, fingerprint, booster, features, prepared):
+        value = (booster, features, prepared)
+        self._save(component_id, fingerprint, value)
+        self._hold(component_id, fingerprint, value)
+
+    def stats(self):
+        with self._lock:
+            return {"models_in_memory": len(self._entries), "bytes_in_memory": self._bytes,
+                    "max_bytes": self.max_bytes}
+
+    def _hold(self, component_id, fingerprint, value):
+        nbytes = self._estimate_bytes(component_id, fingerprint, value)
+        with self._lock:
+            old = self._entries.pop(component_id, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[component_id] = (fingerprint, value, nbytes)
+            self._bytes += nbytes
+            # Always keep the entry just added, even if it alone is over budget
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, (_, _, evicted_bytes) = self._entries.popitem(last=False)
+                self._bytes -= evicted_bytes
+
+    def _estimate_bytes(self, component_id, fingerprint, value):
+        _, _, prepared = value
+        model_path = os.path.join(self._dir(component_id), fingerprint, MODEL_FILE)
+        # The model file is written on put, and its text size tracks the
+        # booster's in-memory size
+        model_bytes = os.path.getsize(model_path) if os.path.exists(model_path) else 0
+        return model_bytes + int(prepared.memory_usage(deep=True).sum())
+
+    def _save(self, component_id, fingerprint, value):
+        booster, features, prepared = value
+        component_dir = self._dir(component_id)
+        # Written to a temp directory and renamed into place, so readers
+        # never see a partial entry
+        tmp_dir = os.path.join(component_dir, f".{fingerprint}.{os.getpid()}.{threading.get_ident()}.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        booster.save_model(os.path.join(tmp_dir, MODEL_FILE))
+        prepared.to_pickle(os.path.join(tmp_dir, FEATURES_FILE))
+        with open(os.path.join(tmp_dir, META_FILE), "w") as f:
+            json.dump({"fingerprint": fingerprint, "features": features}, f)
+        try:
+            os.replace(tmp_dir, os.path.join(component_dir, fingerprint))
+        except OSError:
+            # Another worker already saved the same model
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        # Models for older versions of the series are no longer useful
+        for name in os.listdir(component_dir):
+            if name != fingerprint and not name.startswith("."):
+                shutil.rmtree(os.path.join(component_dir, name), ignore_errors=True)
+
+    def _load(self, component_id, fingerprint):
+        directory = os.path.join(self._dir(component_id), fingerprint)
+        try:
+            with open(os.path.join(directory, META_FILE)) as f:
+                meta = json.load(f)
+            import lightgbm as lgb
+
+            booster = lgb.Booster(model_file=os.path.join(directory, MODEL_FILE))
+            prepared = pd.read_pickle(os.path.join(directory, FEATURES_FILE))
+        except (OSError, ValueError, KeyError):
+            return None
+        print(f"Loaded cached model for component {component_id} from disk")
+        return booster, meta["features"], prepared
@@ -0,0 +1,14 @@
+# names.py - Validation of ids that become file and directory names
+
+import re
+
+_SAFE_NAME = re.compile(r"[\w-]+")
+
+
+def is_safe_name(value):
+    """
+    True if `value` is made only of word characters and hyphens, so it can
+    be used as a single path component (component ids, result names,
+    profile ids). The whole string must match - a trailing newline does not.
+    """
+    return _SAFE_NAME.fullmatch(str(value)) is not None
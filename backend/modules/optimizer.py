@@ -1,10 +1,12 @@
 # optimize_inventory.py - Simplified with Lost Sales Model
 import numpy as np
 import pandas as pd
-from tqdm import tqdm
-from joblib import Parallel, delayed
 import time
 from modules.post_processor import analyze_inventory_policy
+from modules.columnar import pivot_sales
+from modules.metrics import timed
+from modules.scenarios import residual_scenarios
+from modules.serialization import frame_to_columns
 
 
 def simulate_one_path(demand, R, Q, L, h, p, K, I0, track_daily=False):
@@ -24,6 +26,7 @@ def simulate_one_path(demand, R, Q, L, h, p, K, I0, track_daily=False):
 
     Returns:
         total_cost, metrics dict, and optionally daily_data
+        (dict of per-day column lists, ready for pd.DataFrame)
     """
     T = len(demand)
     inventory = float(I0)
@@ -36,7 +39,9 @@ def simulate_one_path(demand, R, Q, L, h, p, K, I0, track_daily=False):
     total_demand = 0.0
     total_sales = 0.0
 
-    daily_data = [] if track_daily else None
+    daily_columns = ('day', 'inventory', 'demand', 'sales', 'lost_sales',
+                     'order_placed', 'holding_cost', 'stockout_cost')
+    daily_data = {col: [] for col in daily_columns} if track_daily else None
 
     for t in range(T):
         # Receive any orders arriving today
@@ -77,16 +82,10 @@ def simulate_one_path(demand, R, Q, L, h, p, K, I0, track_daily=False):
         total_stockout_cost += stockout_cost
 
         if track_daily:
-            daily_data.append({
-                'day': t,
-                'inventory': inventory,
-                'demand': d,
-                'sales': sales,
-                'lost_sales': lost_sales,
-                'order_placed': order_placed,
-                'holding_cost': holding_cost,
-                'stockout_cost': stockout_cost
-            })
+            for col, value in zip(daily_columns, (
+                    t, inventory, d, sales, lost_sales,
+                    order_placed, holding_cost, stockout_cost)):
+                daily_data[col].append(value)
 
     total_cost = total_holding_cost + total_stockout_cost + total_ordering_cost
     fill_rate = total_sales / total_demand if total_demand > 0 else 1.0
@@ -105,9 +104,23 @@ def simulate_one_path(demand, R, Q, L, h, p, K, I0, track_daily=False):
     return total_cost, metrics
 
 
-def simulate_policy_monte_carlo(mu, sigma, R, Q, L, h, p, K, I0, n_sims=200, n_jobs=4):
+@timed("scenario_generation")
+def generate_demand_scenarios(mu, sigma, n_sims, seed=42):
+    """Draw (n_sims, T) normally distributed demand paths, clipped at zero."""
+    rng = np.random.default_rng(seed)
+    demand_scenarios = rng.normal(
+        loc=mu[None, :],
+        scale=sigma[None, :],
+        size=(n_sims, len(mu))
+    )
+    return np.clip(demand_scenarios, 0, None)
+
+
+def simulate_policy_monte_carlo(mu, sigma, R, Q, L, h, p, K, I0, n_sims=200, n_jobs=4,
+                                demand_scenarios=None):
     """
-    Run Monte Carlo simulation with normally distributed demand.
+    Run Monte Carlo simulation with normally distributed demand, or with
+    the given demand paths.
 
     Parameters:
         mu: array of mean daily demand
@@ -115,20 +128,15 @@ def simulate_policy_monte_carlo(mu, sigma, R, Q, L, h, p, K, I0, n_sims=200, n_j
         R, Q, L, h, p, K, I0: policy and cost parameters
         n_sims: number of Monte Carlo simulations
         n_jobs: parallel jobs
+        demand_scenarios: optional (n_sims, T) array of demand paths to
+            simulate instead of drawing normal ones - e.g. from
+            residual_scenarios, or shared across the policies of a search
 
     Returns:
         dict with aggregated statistics
     """
-    T = len(mu)
-    rng = np.random.default_rng(42)
-
-    # Generate demand scenarios
-    demand_scenarios = rng.normal(
-        loc=mu[None, :],
-        scale=sigma[None, :],
-        size=(n_sims, T)
-    )
-    demand_scenarios = np.clip(demand_scenarios, 0, None)
+    if demand_scenarios is None:
+        demand_scenarios = generate_demand_scenarios(mu, sigma, n_sims)
 
     # Run simulations in parallel
     if n_jobs == 1:
@@ -139,6 +147,8 @@ def simulate_policy_monte_carlo(mu, sigma, R, Q, L, h, p, K, I0, n_sims=200, n_j
             )
             results.append((cost, metrics))
     else:
+        from joblib import Parallel, delayed
+
         results = Parallel(n_jobs=n_jobs)(
             delayed(simulate_one_path)(
                 demand_scenarios[i], R, Q, L, h, p, K, I0, track_daily=False
@@ -165,10 +175,14 @@ def simulate_policy_monte_carlo(mu, sigma, R, Q, L, h, p, K, I0, n_sims=200, n_j
     }
 
 
-def grid_search_RQ(mu, sigma, R_grid, Q_grid, L, h, p, K, I0, n_sims=200, n_jobs=4):
+@timed("grid_search_RQ")
+def grid_search_RQ(mu, sigma, R_grid, Q_grid, L, h, p, K, I0, n_sims=200, n_jobs=4,
+                   demand_scenarios=None):
     """
     Grid search over (R, Q) policies using Monte Carlo simulation.
     """
+    from tqdm import tqdm
+
     best = None
     results = []
 
@@ -180,7 +194,8 @@ def grid_search_RQ(mu, sigma, R_grid, Q_grid, L, h, p, K, I0, n_sims=200, n_jobs
         for R in R_grid:
             for Q in Q_grid:
                 stats = simulate_policy_monte_carlo(
-                    mu, sigma, R, Q, L, h, p, K, I0, n_sims, n_jobs
+                    mu, sigma, R, Q, L, h, p, K, I0, n_sims, n_jobs,
+                    demand_scenarios=demand_scenarios
                 )
                 stats['R'] = R
                 stats['Q'] = Q
@@ -195,7 +210,123 @@ def grid_search_RQ(mu, sigma, R_grid, Q_grid, L, h, p, K, I0, n_sims=200, n_jobs
     return df, best
 
 
-def run_optimization(df_pred, h=5.0, p=20.0, K=200.0, L=1, n_sims=200, n_jobs=4):
+def _nearest_index(grid, value):
+    return int(np.argmin(np.abs(np.asarray(grid, dtype=float) - value)))
+
+
+@timed("neighborhood_search_RQ")
+def neighborhood_search_RQ(mu, sigma, R_grid, Q_grid, start, L, h, p, K, I0,
+                           n_sims=200, n_jobs=4, radius=2, demand_scenarios=None):
+    """
+    Search (R, Q) around a previous optimum instead of the whole grid.
+
+    Evaluates the (2*radius+1)^2 window of grid points around `start`
+    (R, Q snapped to the nearest grid points). While the best policy found
+    lies on the window's edge - and the grid continues past it - the window
+    is re-centred on that policy and only its new points are evaluated.
+    With common random numbers (fixed scenario seed) the cost is a smooth
+    function of (R, Q), so this normally ends within one or two windows.
+
+    Returns the same (results_df, best) pair as grid_search_RQ, with only
+    the evaluated policies in results_df.
+    """
+    center = (_nearest_index(R_grid, start[0]), _nearest_index(Q_grid, start[1]))
+    evaluated = {}
+
+    while True:
+        i0, j0 = center
+        for i in range(max(i0 - radius, 0), min(i0 + radius, len(R_grid) - 1) + 1):
+            for j in range(max(j0 - radius, 0), min(j0 + radius, len(Q_grid) - 1) + 1):
+                if (i, j) in evaluated:
+                    continue
+                stats = simulate_policy_monte_carlo(
+                    mu, sigma, R_grid[i], Q_grid[j], L, h, p, K, I0, n_sims, n_jobs,
+                    demand_scenarios=demand_scenarios
+                )
+                stats['R'] = R_grid[i]
+                stats['Q'] = Q_grid[j]
+                evaluated[(i, j)] = stats
+
+        bi, bj = min(evaluated, key=lambda ij: evaluated[ij]['mean_cost'])
+        on_edge = (
+            (abs(bi - i0) >= radius and 0 < bi < len(R_grid) - 1)
+            or (abs(bj - j0) >= radius and 0 < bj < len(Q_grid) - 1)
+        )
+        if not on_edge or (bi, bj) == center:
+            break
+        center = (bi, bj)
+
+    print(f"Warm start: evaluated {len(evaluated)} of "
+          f"{len(R_grid) * len(Q_grid)} policy combinations")
+    df = pd.DataFrame([evaluated[ij] for ij in sorted(evaluated)])
+    return df, evaluated[(bi, bj)].copy()
+
+
+@timed("constrained_search_RQ")
+def constrained_search_RQ(mu, sigma, R_grid, Q_grid, target_fill_rate, L, h, p, K, I0,
+                          n_sims=200, n_jobs=4, demand_scenarios=None):
+    """
+    Cheapest (R, Q) policy whose mean fill rate reaches `target_fill_rate`.
+
+    Relies on the fill rate being non-decreasing in R for a fixed Q (a higher
+    reorder point only ever orders earlier; the scenarios are the same for
+    every policy). For each Q the smallest feasible R is found by bisection,
+    which skips the infeasible low reorder points, and every R from there up
+    is evaluated - cost is often flat over long stretches of R before it
+    drops, so stopping at the first non-improving step can miss the optimum.
+
+    Returns (results_df, best, feasible). If no grid policy reaches the
+    target, `best` is the policy with the highest fill rate and feasible is
+    False.
+    """
+    evaluated = {}
+
+    def evaluate(i, j):
+        if (i, j) not in evaluated:
+            stats = simulate_policy_monte_carlo(
+                mu, sigma, R_grid[i], Q_grid[j], L, h, p, K, I0, n_sims, n_jobs,
+                demand_scenarios=demand_scenarios
+            )
+            stats['R'] = R_grid[i]
+            stats['Q'] = Q_grid[j]
+            evaluated[(i, j)] = stats
+        return evaluated[(i, j)]
+
+    def feasible(i, j):
+        return evaluate(i, j)['mean_fill_rate'] >= target_fill_rate
+
+    best = None
+    for j in range(len(Q_grid)):
+        lo, hi = 0, len(R_grid) - 1
+        if not feasible(hi, j):
+            continue
+        # Smallest R index meeting the target
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if feasible(mid, j):
+                hi = mid
+            else:
+                lo = mid + 1
+        for i in range(lo, len(R_grid)):
+            stats = evaluate(i, j)
+            # Ties go to the lower R, then Q - as in grid_search_RQ
+            if best is None or (stats['mean_cost'], stats['R'], stats['Q']) < (
+                    best['mean_cost'], best['R'], best['Q']):
+                best = stats
+
+    is_feasible = best is not None
+    if not is_feasible:
+        best = max(evaluated.values(), key=lambda s: (s['mean_fill_rate'], -s['mean_cost']))
+
+    print(f"Constrained search (fill rate >= {target_fill_rate:.1%}): evaluated "
+          f"{len(evaluated)} of {len(R_grid) * len(Q_grid)} policy combinations")
+    df = pd.DataFrame([evaluated[ij] for ij in sorted(evaluated)])
+    return df, best.copy(), is_feasible
+
+
+def run_optimization(df_pred, h=5.0, p=20.0, K=200.0, L=1, n_sims=200, n_jobs=4,
+                     output_format="records", policy_store=None, component_id="default",
+                     target_fill_rate=None, residuals=None):
     """
     Run complete optimization pipeline on forecast data.
 
@@ -207,6 +338,19 @@ def run_optimization(df_pred, h=5.0, p=20.0, K=200.0, L=1, n_sims=200, n_jobs=4)
         L: lead time in days
         n_sims: number of Monte Carlo simulations
         n_jobs: parallel processing jobs
+        output_format: 'records' returns daily_simulation/all_policies as
+            lists of row dicts; 'columnar' as {column: [values]}
+        policy_store: optional PolicyStore. The optimum is saved there per
+            component and parameter set; when a previous optimum exists only
+            its neighborhood is searched (see neighborhood_search_RQ)
+        component_id: key of the component being planned in policy_store
+        target_fill_rate: if set (e.g. 0.95), return the cheapest policy whose
+            mean fill rate reaches it (see constrained_search_RQ) instead of
+            the unconstrained cost minimum; policy_store is not used
+        residuals: optional log-scale forecast residuals (see
+            demand_predictor.get_forecast_residuals). Demand scenarios are
+            then block-bootstrapped from them (see residual_scenarios)
+            instead of drawn from a normal distribution around the forecast
 
     Returns:
         dict with optimal policy, results, and analytics
@@ -214,11 +358,14 @@ def run_optimization(df_pred, h=5.0, p=20.0, K=200.0, L=1, n_sims=200, n_jobs=4)
     # Check if data has stores or is aggregated
     if 'store' in df_pred.columns and 'sales' in df_pred.columns:
         # Multi-store data: calculate mu and sigma across stores
-        pivot = df_pred.pivot_table(
-            index="date", columns="store", values="sales")
-        pivot = pivot.sort_index()
-        mu = pivot.mean(axis=1).values.astype(float)
-        sigma = pivot.std(axis=1).fillna(1.0).values.astype(float)
+        _, _, pivot = pivot_sales(
+            df_pred['date'].to_numpy(),
+            df_pred['store'].to_numpy(),
+            df_pred['sales'].to_numpy(dtype=float))
+        counts = np.sum(~np.isnan(pivot), axis=1)
+        mu = np.nansum(pivot, axis=1) / counts
+        var = np.nansum((pivot - mu[:, None]) ** 2, axis=1) / np.maximum(counts - 1, 1)
+        sigma = np.where(counts > 1, np.sqrt(var), 1.0)
         sigma = np.maximum(sigma, 1.0)  # Floor at 1.0
     elif 'demand' in df_pred.columns:
         # Aggregated forecast data: use demand directly, estimate sigma as % of mu
@@ -246,20 +393,100 @@ def run_optimization(df_pred, h=5.0, p=20.0, K=200.0, L=1, n_sims=200, n_jobs=4)
 
     I0 = mean_demand * 0.5
 
-    # Run grid search
-    results_df, best = grid_search_RQ(
-        mu=mu,
-        sigma=sigma,
-        R_grid=R_grid,
-        Q_grid=Q_grid,
-        L=L,
-        h=h,
-        p=p,
-        K=K,
-        I0=I0,
-        n_sims=n_sims,
-        n_jobs=n_jobs
-    )
+    # Costs are only comparable for the same parameters and horizon
+    search_params = {'h': h, 'p': p, 'K': K, 'L': L, 'n_sims': n_sims, 'horizon': T}
+    if target_fill_rate is not None:
+        policy_store = None
+
+    # One set of scenarios shared by every policy evaluated (common random
+    # numbers), drawn once per run
+    if residuals is not None:
+        demand_scenarios = residual_scenarios(mu, residuals, n_sims)
+        # Costs under residual scenarios are not comparable with normal ones
+        search_params['residual_scenarios'] = 1
+    else:
+        demand_scenarios = generate_demand_scenarios(mu, sigma, n_sims)
+
+    previous = policy_store.get(component_id, search_params) if policy_store else None
+
+    feasible = None
+    if target_fill_rate is not None:
+        results_df, best, feasible = constrained_search_RQ(
+            mu=mu,
+            sigma=sigma,
+            R_grid=R_grid,
+            Q_grid=Q_grid,
+            target_fill_rate=target_fill_rate,
+            L=L,
+            h=h,
+            p=p,
+            K=K,
+            I0=I0,
+            n_sims=n_sims,
+            n_jobs=n_jobs,
+            demand_scenarios=demand_scenarios
+        )
+    elif previous is not None:
+        results_df, best = neighborhood_search_RQ(
+            mu=mu,
+            sigma=sigma,
+            R_grid=R_grid,
+            Q_grid=Q_grid,
+            start=(previous['R'], previous['Q']),
+            L=L,
+            h=h,
+            p=p,
+            K=K,
+            I0=I0,
+            n_sims=n_sims,
+            n_jobs=n_jobs,
+            demand_scenarios=demand_scenarios
+        )
+    else:
+        # Run grid search
+        results_df, best = grid_search_RQ(
+            mu=mu,
+            sigma=sigma,
+            R_grid=R_grid,
+            Q_grid=Q_grid,
+            L=L,
+            h=h,
+            p=p,
+            K=K,
+            I0=I0,
+            n_sims=n_sims,
+            n_jobs=n_jobs,
+            demand_scenarios=demand_scenarios
+        )
+
+    if target_fill_rate is not None:
+        mode = 'constrained'
+    else:
+        mode = 'warm' if previous is not None else 'cold'
+    search = {
+        'mode': mode,
+        'scenarios': 'residual' if residuals is not None else 'normal',
+        'policies_evaluated': len(results_df),
+        'simulations': len(results_df) * n_sims,
+        'grid_size': len(R_grid) * len(Q_grid),
+        'previous_policy': (
+            {'reorder_point': float(previous['R']), 'order_quantity': float(previous['Q'])}
+            if previous is not None else None),
+    }
+    if target_fill_rate is not None:
+        search['target_fill_rate'] = float(target_fill_rate)
+        search['feasible'] = feasible
+    if policy_store is not None:
+        policy_store.put(component_id, search_params, {
+            'R': float(best['R']),
+            'Q': float(best['Q']),
+            'mean_cost': float(best['mean_cost']),
+            'mean_demand': float(mean_demand),
+            'R_grid': [R_min, R_max, R_step],
+            'Q_grid': [Q_min, Q_max, Q_step],
+            'policies_evaluated': search['policies_evaluated'],
+            'updated': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
 
     # Run detailed deterministic simulation
     cost_det, metrics_det, daily_data = simulate_one_path(
@@ -276,6 +503,12 @@ def run_optimization(df_pred, h=5.0, p=20.0, K=200.0, L=1, n_sims=200, n_jobs=4)
 
     daily_df = pd.DataFrame(daily_data)
 
+    if output_format == "columnar":
+        to_output = frame_to_columns
+    else:
+        def to_output(df):
+            return df.to_dict(orient='records')
+
     # Get detailed analysis
     analysis = analyze_inventory_policy(
         results_df=daily_df,
@@ -322,8 +555,9 @@ def run_optimization(df_pred, h=5.0, p=20.0, K=200.0, L=1, n_sims=200, n_jobs=4)
             'mean_fill_rate': float(best['mean_fill_rate']),
             'mean_orders': float(best['mean_orders'])
         },
-        'daily_simulation': daily_df.to_dict(orient='records'),
-        'all_policies': results_df.to_dict(orient='records')
+        'search': search,
+        'daily_simulation': to_output(daily_df),
+        'all_policies': to_output(results_df)
     }
 
 
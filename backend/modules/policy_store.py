@@ -0,0 +1,58 @@
+# policy_store.py - Last optimal (R, Q) per component, for warm-started re-optimization
+
+import hashlib
+import json
+import os
+import threading
+
+from modules.names import is_safe_name
+
+
+def params_key(params):
+    """Stable short hash of a cost/simulation parameter dict."""
+    normalized = {k: float(v) for k, v in sorted(params.items())}
+    return hashlib.md5(json.dumps(normalized).encode()).hexdigest()[:16]
+
+
+class PolicyStore:
+    """
+    JSON files under `state_dir`, one per component:
+
+        <state_dir>/<component_id>.json = {params_key: state, ...}
+
+    `state` is whatever the optimizer saved for that parameter set - the
+    optimal R and Q, the grid they were found on and the search statistics.
+    Writes go through a temp file and rename, so concurrent workers never
+    read a half-written file (the last writer wins).
+    """
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self._lock = threading.Lock()
+
+    def _path(self, component_id):
+        if not is_safe_name(component_id):
+            raise ValueError(f"Invalid component id: {component_id!r}")
+        return os.path.join(self.state_dir, f"{component_id}.json")
+
+    def _read(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get(self, component_id, params):
+        """Saved state for this component and parameter set, or None."""
+        return self._read(self._path(component_id)).get(params_key(params))
+
+    def put(self, component_id, params, state):
+        path = self._path(component_id)
+        with self._lock:
+            os.makedirs(self.state_dir, exist_ok=True)
+            entries = self._read(path)
+            entries[params_key(params)] = state
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, path)
@@ -2,8 +2,10 @@
 
 import numpy as np
 import pandas as pd
+from modules.metrics import timed
 
 
+@timed("analyze_inventory_policy")
 def analyze_inventory_policy(results_df, policy, demand_series, h, p, K):
     """
     Analyze inventory policy performance with LOST SALES model.
@@ -0,0 +1,119 @@
+# profiling.py - On-demand CPU and memory profiling of single requests
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+import uuid
+
+from modules.names import is_safe_name
+
+# Number of entries kept in the text report
+TOP_FUNCTIONS = 40
+TOP_ALLOCATIONS = 25
+
+# Files written per profile: <id>.prof (pstats, open with snakeviz or
+# pstats.Stats), <id>.txt (readable summary), <id>.json (metadata)
+PROFILE_KINDS = {"prof": "application/octet-stream", "txt": "text/plain", "json": "application/json"}
+
+# tracemalloc is process-global, so only one request is profiled at a time
+_profile_lock = threading.Lock()
+
+
+class ProfilerBusy(Exception):
+    """Raised when another request is already being profiled."""
+
+
+class RequestProfiler:
+    """
+    Capture a cProfile call graph and tracemalloc top allocations for one
+    block of code and store them under `profile_dir`.
+
+        with RequestProfiler(profile_dir, "optimize-inventory") as prof:
+            ...
+        prof.profile_id
+
+    cProfile only sees the calling thread and tracemalloc counts allocations
+    from every thread, so results are cleanest on an otherwise idle worker.
+    Work offloaded to joblib worker processes is not captured.
+    """
+
+    def __init__(self, profile_dir, label):
+        self.profile_dir = profile_dir
+        self.label = label
+        self.profile_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:8]}"
+        self._profiler = cProfile.Profile()
+
+    def __enter__(self):
+        if not _profile_lock.acquire(blocking=False):
+            raise ProfilerBusy("Another request is already being profiled")
+        self._start = time.perf_counter()
+        tracemalloc.start()
+        self._profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            self._profiler.disable()
+            elapsed = time.perf_counter() - self._start
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            self._save(snapshot, elapsed, current, peak)
+        finally:
+            _profile_lock.release()
+        return False
+
+    def _save(self, snapshot, elapsed, current, peak):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        base = os.path.join(self.profile_dir, self.profile_id)
+        self._profiler.dump_stats(f"{base}.prof")
+
+        out = io.StringIO()
+        out.write(f"Profile {self.profile_id}\n")
+        out.write(f"Wall time: {elapsed:.3f}s  Peak traced memory: {peak / 1e6:.1f} MB\n\n")
+        stats = pstats.Stats(self._profiler, stream=out)
+        stats.sort_stats("cumulative").print_stats(TOP_FUNCTIONS)
+        out.write(f"\nTop {TOP_ALLOCATIONS} allocation sites (still allocated at end of request)\n")
+        for stat in snapshot.statistics("lineno")[:TOP_ALLOCATIONS]:
+            out.write(f"{stat}\n")
+        with open(f"{base}.txt", "w") as f:
+            f.write(out.getvalue())
+
+        with open(f"{base}.json", "w") as f:
+            json.dump({
+                "id": self.profile_id,
+                "label": self.label,
+                "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "wall_time_s": elapsed,
+                "traced_memory_peak_bytes": peak,
+                "traced_memory_end_bytes": current,
+            }, f)
+
+
+def list_profiles(profile_dir):
+    """Metadata of stored profiles, newest first."""
+    if not os.path.isdir(profile_dir):
+        return []
+    profiles = []
+    for name in os.listdir(profile_dir):
+        if name.endswith(".json"):
+            with open(os.path.join(profile_dir, name)) as f:
+                profiles.append(json.load(f))
+    return sorted(profiles, key=lambda p: p["id"], reverse=True)
+
+
+def profile_path(profile_dir, profile_id, kind):
+    """
+    Path of a stored profile file, or None if it does not exist.
+
+    Rejects ids that could escape `profile_dir`.
+    """
+    if kind not in PROFILE_KINDS or not is_safe_name(profile_id):
+        return None
+    path = os.path.join(profile_dir, f"{profile_id}.{kind}")
+    return path if os.path.isfile(path) else None
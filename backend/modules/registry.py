@@ -0,0 +1,137 @@
+# registry.py - Per-component sales datasets, loaded on demand
+
+import os
+import threading
+from collections import OrderedDict
+
+from modules.dataset import SalesDataset, VersionedCache
+from modules.names import is_safe_name
+from modules.rollups import SalesRollups
+
+DEFAULT_COMPONENT = "default"
+
+# Header written for a newly created component
+NEW_COMPONENT_HEADER = "date,sales,store\n"
+
+
+class UnknownComponent(KeyError):
+    """Raised for a component id that has no dataset."""
+
+
+class Component:
+    """One component's dataset and everything derived from it."""
+
+    def __init__(self, component_id, csv_path):
+        self.component_id = component_id
+        self.dataset = SalesDataset(csv_path).load()
+        # Daily/weekly/monthly totals kept in step with every write; the
+        # daily total is also the forecaster's training series
+        self.rollups = SalesRollups()
+        self.dataset.observe(self.rollups)
+        self.forecast_cache = VersionedCache(self.dataset)
+        self.optimization_cache = VersionedCache(self.dataset)
+        self.data_view_cache = VersionedCache(self.dataset)
+
+
+class DatasetRegistry:
+    """
+    Component id -> Component, each backed by its own CSV.
+
+    The default component is `default_csv_path` (data/daily_sales.csv);
+    every other component is `<components_dir>/<id>.csv`. Components are
+    loaded on first use and at most `max_loaded` are kept in memory, least
+    recently used first out - their data stays on disk, so an evicted
+    component is simply loaded again. The default component is never
+    evicted. `on_load(component)` is called for every component loaded.
+    """
+
+    def __init__(self, default_csv_path, components_dir, max_loaded=128, on_load=None):
+        self.default_csv_path = default_csv_path
+        self.components_dir = components_dir
+        self.max_loaded = max_loaded
+        self.on_load = on_load
+        self._lock = threading.Lock()
+        self._loaded = OrderedDict()
+        # component id -> Event set when its load in progress finishes
+        self._loading = {}
+
+    def csv_path(self, component_id):
+        if component_id == DEFAULT_COMPONENT:
+            return self.default_csv_path
+        if not is_safe_name(component_id):
+            raise ValueError(f"Invalid component id: {component_id!r}")
+        return os.path.join(self.components_dir, f"{component_id}.csv")
+
+    def get(self, component_id=DEFAULT_COMPONENT, create=False):
+        """
+        The loaded Component for `component_id`.
+
+        Raises UnknownComponent if it has no CSV yet, unless `create` is
+        set, in which case an empty one is created.
+
+        Loading happens outside the registry lock, so a slow load only
+        holds up requests for that component; concurrent requests for it
+        wait for the one load in progress instead of starting their own.
+        """
+        csv_path = self.csv_path(component_id)
+        while True:
+            with self._lock:
+                component = self._loaded.get(component_id)
+                if component is not None:
+                    self._loaded.move_to_end(component_id)
+                    return component
+                loading = self._loading.get(component_id)
+                if loading is None:
+                    loading = self._loading[component_id] = threading.Event()
+                    break
+            # Another thread is loading it; if that load failed, try ourselves
+            loading.wait()
+
+        try:
+            if not os.path.exists(csv_path):
+                if not create:
+                    raise UnknownComponent(component_id)
+                os.makedirs(os.path.dirname(csv_path), exist_ok=True)
+                # 'x' so a concurrent creator in another process keeps its rows
+                try:
+                    with open(csv_path, "x") as f:
+                        f.write(NEW_COMPONENT_HEADER)
+                except FileExistsError:
+                    pass
+
+            component = Component(component_id, csv_path)
+            if self.on_load is not None:
+                self.on_load(component)
+            with self._lock:
+                self._loaded[component_id] = component
+                self._evict()
+            return component
+        finally:
+            with self._lock:
+                del self._loading[component_id]
+            loading.set()
+
+    def _evict(self):
+        # Caller holds the lock
+        while len(self._loaded) > self.max_loaded:
+            for component_id in self._loaded:
+                if component_id != DEFAULT_COMPONENT:
+                    del self._loaded[component_id]
+                    break
+            else:
+                return
+
+    def loaded(self):
+        """Components currently in memory."""
+        with self._lock:
+            return list(self._loaded.values())
+
+    def ids(self):
+        """All component ids with data on disk, default first."""
+        ids = [DEFAULT_COMPONENT]
+        if os.path.isdir(self.components_dir):
+            ids += sorted(
+                name[:-len(".csv")] for name in os.listdir(self.components_dir)
+                if name.endswith(".csv") and is_safe_name(name[:-len(".csv")])
+                and name != f"{DEFAULT_COMPONENT}.csv")
+        return ids
@@ -0,0 +1,45 @@
+# result_store.py - Persisted forecast/optimization results per component
+
+import json
+import os
+import threading
+
+from modules.names import is_safe_name
+
+
+class ResultStore:
+    """
+    JSON results under `result_dir`:
+
+        <result_dir>/<component_id>/<name>.json = {"fingerprint": ..., "value": ...}
+
+    A result is only returned while the caller's fingerprint (a content hash
+    of the component's sales history) still matches the one it was computed
+    from, so stale results are never served. Files are replaced atomically
+    and are shared by every worker process.
+    """
+
+    def __init__(self, result_dir):
+        self.result_dir = result_dir
+
+    def _path(self, component_id, name):
+        if not is_safe_name(component_id) or not is_safe_name(name):
+            raise ValueError(f"Invalid result key: {component_id!r}/{name!r}")
+        return os.path.join(self.result_dir, component_id, f"{name}.json")
+
+    def get(self, component_id, name, fingerprint):
+        """Stored value computed from `fingerprint`, or None."""
+        try:
+            with open(self._path(component_id, name)) as f:
+                entry = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return entry["value"] if entry.get("fingerprint") == fingerprint else None
+
+    def put(self, component_id, name, fingerprint, value):
+        path = self._path(component_id, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"fingerprint": fingerprint, "value": value}, f)
+        os.replace(tmp_path, path)
@@ -0,0 +1,156 @@
+# rollups.py - Incrementally maintained sales aggregates
+
+import threading
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+DATE_COL = "date"
+TARGET = "sales"
+GRANULARITIES = ("daily", "weekly", "monthly")
+
+# Bucket key used for totals across all stores
+ALL_STORES = None
+
+
+def _period_numbers(days):
+    """Period numbers per granularity for int64 day numbers (days since 1970-01-01)."""
+    return {
+        "daily": days,
+        # Weeks are keyed by their Monday; 1970-01-01 was a Thursday
+        "weekly": days - (days + 3) % 7,
+        "monthly": days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64),
+    }
+
+
+def _unit(granularity):
+    return "M" if granularity == "monthly" else "D"
+
+
+class SalesRollups:
+    """
+    Daily, weekly and monthly sales totals, overall and per store.
+
+    Registered as a SalesDataset observer: the full aggregate is built once
+    on load and every committed change then only adds the new rows and
+    subtracts the removed ones, so serving a rollup never touches raw rows.
+    Rows without a store (the single-series daily_sales.csv) count towards
+    the overall totals only.
+
+    Periods are held as datetime64 numbers (days, or months for monthly)
+    and only formatted as YYYY-MM-DD / YYYY-MM when served.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (granularity, store) -> period number -> sales total / row count
+        self._totals = defaultdict(dict)
+        self._rows = defaultdict(dict)
+
+    def reset(self, df):
+        with self._lock:
+            self._totals = defaultdict(dict)
+            self._rows = defaultdict(dict)
+            self._add(df, sign=1)
+
+    def apply(self, added, removed):
+        with self._lock:
+            self._add(removed, sign=-1)
+            self._add(added, sign=1)
+
+    def _add(self, df, sign):
+        if len(df) == 0 or DATE_COL not in df.columns or TARGET not in df.columns:
+            return
+        dates = pd.to_datetime(df[DATE_COL], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        sales = pd.to_numeric(df[TARGET], errors="coerce").to_numpy(dtype=float)
+        valid = ~np.isnat(dates) & ~np.isnan(sales)
+        if not valid.any():
+            return
+        days = dates[valid].astype("datetime64[D]").astype(np.int64)
+        sales = sales[valid]
+        if "store" in df.columns:
+            stores = pd.to_numeric(df["store"], errors="coerce").to_numpy(dtype=float)[valid]
+        else:
+            stores = np.full(len(days), np.nan)
+
+        # Group 0 is the all-stores total; group k > 0 is store_ids[k - 1].
+        # Rows with a store are counted in both.
+        has_store = ~np.isnan(stores)
+        store_ids, store_codes = np.unique(stores[has_store], return_inverse=True)
+        groups = np.concatenate([np.zeros(len(days), dtype=np.int64), store_codes + 1])
+        owners = [ALL_STORES] + [int(store) for store in store_ids]
+        sales = np.concatenate([sales, sales[has_store]])
+
+        for granularity, periods in _period_numbers(days).items():
+            periods = np.concatenate([periods, periods[has_store]])
+            # One sort and two bincounts aggregate every (group, period)
+            first = periods.min()
+            span = int(periods.max() - first) + 1
+            keys, inverse = np.unique(groups * span + (periods - first), return_inverse=True)
+            totals = np.bincount(inverse, weights=sales)
+            counts = np.bincount(inverse)
+            key_groups = keys // span
+            key_periods = (keys % span + first).tolist()
+            # keys are sorted, so each group's periods are one contiguous run
+            bounds = np.flatnonzero(np.diff(key_groups)) + 1
+            for lo, hi in zip(np.r_[0, bounds], np.r_[bounds, len(keys)]):
+                self._merge(granularity, owners[key_groups[lo]], key_periods[lo:hi],
+                            totals[lo:hi].tolist(), counts[lo:hi].tolist(), sign)
+
+    def _merge(self, granularity, store, periods, totals, counts, sign):
+        period_totals = self._totals[(granularity, store)]
+        period_rows = self._rows[(granularity, store)]
+        if not period_rows and sign > 0:
+            period_totals.update(zip(periods, totals))
+            period_rows.update(zip(periods, counts))
+            return
+        for period, total, count in zip(periods, totals, counts):
+            rows = period_rows.get(period, 0) + sign * count
+            if rows <= 0:
+                period_totals.pop(period, None)
+                period_rows.pop(period, None)
+            else:
+                period_totals[period] = period_totals.get(period, 0.0) + sign * total
+                period_rows[period] = rows
+
+    def series(self, granularity="daily", store=ALL_STORES, start=None, end=None):
+        """
+        Rollup rows sorted by period: [{'period', 'sales', 'rows'}, ...].
+
+        `start`/`end` are inclusive period keys (YYYY-MM-DD, or YYYY-MM for
+        monthly).
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+        unit = _unit(granularity)
+        lo = None if start is None else np.datetime64(start, unit).astype(np.int64)
+        hi = None if end is None else np.datetime64(end, unit).astype(np.int64)
+        with self._lock:
+            period_totals = self._totals.get((granularity, store), {})
+            period_rows = self._rows.get((granularity, store), {})
+            items = sorted(
+                (period, period_totals[period], count)
+                for period, count in period_rows.items()
+                if (lo is None or period >= lo) and (hi is None or period <= hi))
+        labels = np.datetime_as_string(
+            np.array([period for period, _, _ in items], dtype=f"datetime64[{unit}]"))
+        return [
+            {"period": label, TARGET: total, "rows": count}
+            for label, (_, total, count) in zip(labels.tolist(), items)
+        ]
+
+    def stores(self):
+        """Store ids with at least one row, sorted."""
+        with self._lock:
+            return sorted(
+                store for (granularity, store), period_rows in self._rows.items()
+                if granularity == "daily" and store is not ALL_STORES and period_rows)
+
+    def daily_frame(self, store=ALL_STORES):
+        """Daily totals as a ['date', 'sales'] frame - the forecaster's training series."""
+        rows = self.series("daily", store)
+        return pd.DataFrame({
+            DATE_COL: pd.to_datetime([r["period"] for r in rows]),
+            TARGET: [r[TARGET] for r in rows],
+        })
@@ -0,0 +1,173 @@
+# scheduler.py - In-process background task scheduler
+
+import itertools
+import threading
+import time
+import traceback
+
+try:
+    import fcntl
+except ImportError:  # Windows: every process may lead (dev server only)
+    fcntl = None
+
+# How often a worker re-checks whether the server has gone idle
+IDLE_POLL_SECONDS = 0.5
+
+
+class _Task:
+    __slots__ = ("key", "fn", "priority", "run_at", "seq")
+
+    def __init__(self, key, fn, priority, run_at, seq):
+        self.key = key
+        self.fn = fn
+        self.priority = priority
+        self.run_at = run_at
+        self.seq = seq
+
+
+class Scheduler:
+    """
+    Priority queue of background tasks run by `max_workers` daemon threads.
+
+        scheduler.submit(("precompute", "widget-1"), fn, priority=0, delay=5)
+        scheduler.every(300, enqueue_everything)
+        scheduler.start()
+
+    Lower priority values run first, ties in submission order. A task is
+    identified by its key: submitting a key that is already queued replaces
+    it (keeping the more urgent priority and the later start time, which
+    debounces bursts of triggers), and a key never runs twice at once.
+
+    With `is_idle`, workers hold back a ready task while the server is busy
+    (is_idle() returns False), for at most `max_idle_wait` seconds so
+    background work cannot be starved indefinitely.
+    """
+
+    def __init__(self, max_workers=1, is_idle=None, max_idle_wait=60.0):
+        self.max_workers = max_workers
+        self.is_idle = is_idle
+        self.max_idle_wait = max_idle_wait
+        self._cond = threading.Condition()
+        self._tasks = {}
+        self._running = set()
+        self._seq = itertools.count()
+        self._stop = threading.Event()
+        self._started = False
+        self._completed = 0
+        self._failed = 0
+
+    @property
+    def started(self):
+        return self._started
+
+    def start(self):
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.max_workers):
+            threading.Thread(target=self._work, name=f"scheduler-{i}", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+
+    def submit(self, key, fn, priority=0, delay=0.0):
+        """Queue fn() under `key`. Ignored until the scheduler is started."""
+        if not self._started:
+            return False
+        run_at = time.monotonic() + delay
+        with self._cond:
+            queued = self._tasks.get(key)
+            if queued is not None:
+                priority = min(priority, queued.priority)
+                run_at = max(run_at, queued.run_at)
+            self._tasks[key] = _Task(key, fn, priority, run_at, next(self._seq))
+            self._cond.notify()
+        return True
+
+    def every(self, interval, fn, initial_delay=0.0):
+        """Call fn() on a daemon thread every `interval` seconds."""
+        def loop():
+            if self._stop.wait(initial_delay):
+                return
+            while True:
+                try:
+                    fn()
+                except Exception:
+                    traceback.print_exc()
+                if self._stop.wait(interval):
+                    return
+        threading.Thread(target=loop, name="scheduler-cadence", daemon=True).start()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "started": self._started,
+                "queued": len(self._tasks),
+                "running": len(self._running),
+                "completed": self._completed,
+                "failed": self._failed,
+            }
+
+    def _next_task(self):
+        # Blocks until a task is due, not already running and (if gated)
+        # the server is idle; returns None once stopped
+        with self._cond:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                due = [t for t in self._tasks.values()
+                       if t.run_at <= now and t.key not in self._running]
+                if not due:
+                    pending = [t.run_at for t in self._tasks.values()
+                               if t.key not in self._running]
+                    self._cond.wait(min(pending) - now if pending else None)
+                    continue
+                task = min(due, key=lambda t: (t.priority, t.seq))
+                if (self.is_idle is not None and not self.is_idle()
+                        and now - task.run_at < self.max_idle_wait):
+                    self._cond.wait(IDLE_POLL_SECONDS)
+                    continue
+                del self._tasks[task.key]
+                self._running.add(task.key)
+                return task
+        return None
+
+    def _work(self):
+        while True:
+            task = self._next_task()
+            if task is None:
+                return
+            try:
+                task.fn()
+                failed = False
+            except Exception:
+                print(f"Background task {task.key} failed:")
+                traceback.print_exc()
+                failed = True
+            with self._cond:
+                self._running.discard(task.key)
+                if failed:
+                    self._failed += 1
+                else:
+                    self._completed += 1
+                # A resubmission of this key may have been waiting for it
+                self._cond.notify_all()
+
+
+def acquire_leader_lock(lock_path):
+    """
+    Try to become the one process (of several gunicorn workers) that runs
+    background work. Returns the open lock file - keep a reference for the
+    life of the process - or None if another process holds it.
+    """
+    if fcntl is None:
+        return open(lock_path, "a")
+    f = open(lock_path, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return None
+    return f
@@ -0,0 +1,42 @@
+# serialization.py - Records vs columnar JSON payload helpers
+
+# Accepted values of the `format` request option
+RESPONSE_FORMATS = ("records", "columnar")
+
+
+def frame_to_columns(df):
+    """
+    DataFrame -> {column: list}.
+
+    Goes through `ndarray.tolist()`, which converts a whole column of NumPy
+    scalars to Python numbers in C instead of boxing them one by one.
+    """
+    return {col: df[col].to_numpy().tolist() for col in df.columns}
+
+
+def records_to_columns(records):
+    """[{col: value}, ...] -> {col: [values]} (keys taken from the first row)."""
+    if not records:
+        return {}
+    return {key: [row[key] for row in records] for key in records[0]}
+
+
+def columns_to_records(columns):
+    """{col: [values]} -> [{col: value}, ...] - the default response shape."""
+    keys = list(columns)
+    return [dict(zip(keys, row)) for row in zip(*columns.values())]
+
+
+def downsample_columns(columns, step):
+    """Keep every `step`-th row (first row always kept) of a columnar table."""
+    if step <= 1:
+        return columns
+    return {col: values[::step] for col, values in columns.items()}
+
+
+def to_format(columns, fmt):
+    """Render a columnar table in the requested response format."""
+    if fmt == "columnar":
+        return columns
+    return columns_to_records(columns)
+
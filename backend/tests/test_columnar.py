@@ -0,0 +1,93 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.columnar import MANIFEST, ColumnarHistory, columnar_dir
+from modules.dataset import SalesDataset
+from modules.registry import DatasetRegistry
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    pd.DataFrame({
+        "date": ["2024-01-01", "2024-01-01", "2024-01-02"],
+        "sales": [5, 7, 9],
+        "store": [1, 2, 1],
+    }).to_csv(path, index=False)
+    return path
+
+
+def npy_inode(csv_path, name="sales"):
+    return os.stat(os.path.join(columnar_dir(csv_path), f"{name}.npy")).st_ino
+
+
+def test_to_frame_round_trips_csv(csv_path):
+    history = ColumnarHistory.load(csv_path)
+    assert history.to_frame().equals(pd.read_csv(csv_path))
+
+
+def test_append_extends_arrays_in_place(csv_path):
+    dataset = SalesDataset(csv_path).load()
+    inode = npy_inode(csv_path)
+    dataset.append([{"date": "2024-01-03", "sales": 11, "store": 2}])
+
+    assert npy_inode(csv_path) == inode
+    # A fresh reader finds the columnar copy current and identical to the CSV
+    reopened = ColumnarHistory.load(csv_path)
+    assert reopened.to_frame().equals(pd.read_csv(csv_path))
+
+
+@pytest.mark.parametrize("row", [
+    {"date": "2023-12-31", "sales": 1, "store": 1},  # would leave dates unsorted
+    {"date": "2024-01-05", "sales": 2.5, "store": 1},  # float into an int column
+])
+def test_append_falls_back_to_rebuild(csv_path, row):
+    dataset = SalesDataset(csv_path).load()
+    inode = npy_inode(csv_path)
+    dataset.append([row])
+
+    assert npy_inode(csv_path) != inode
+    assert ColumnarHistory.load(csv_path).to_frame().equals(pd.read_csv(csv_path))
+
+
+def test_open_ignores_rows_beyond_manifest(csv_path):
+    history = ColumnarHistory.load(csv_path)
+    directory = columnar_dir(csv_path)
+    # Simulate an append that extended the arrays but not yet the manifest
+    with open(os.path.join(directory, MANIFEST)) as f:
+        manifest = json.load(f)
+    manifest["rows"] -= 1
+    with open(os.path.join(directory, MANIFEST), "w") as f:
+        json.dump(manifest, f)
+
+    reopened = ColumnarHistory.open(directory)
+    assert len(reopened) == len(history) - 1
+    assert np.array_equal(reopened.columns["sales"], [5, 7])
+
+
+def test_new_component_is_stored_columnar(tmp_path):
+    registry = DatasetRegistry(str(tmp_path / "default.csv"), str(tmp_path / "components"))
+    component = registry.get("widget", create=True)
+    manifest = os.path.join(columnar_dir(component.dataset.csv_path), MANIFEST)
+    assert not os.path.exists(manifest)  # header only
+
+    component.dataset.append([{"date": "2024-01-01", "sales": 5, "store": 1}])
+    component.dataset.append([{"date": "2024-01-02", "sales": 6, "store": 1}])
+    history = ColumnarHistory.open(columnar_dir(component.dataset.csv_path))
+    assert np.array_equal(history.columns["sales"], [5, 6])
+
+
+def test_daily_frame_sums_stores_in_date_order(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    pd.DataFrame({
+        "date": ["2024-01-02", "2024-01-01", "2024-01-02", "2024-01-03"],
+        "sales": [1, 2, 3, 4],
+        "store": [1, 1, 2, 1],
+    }).to_csv(path, index=False)
+    frame = ColumnarHistory.load(path).daily_frame()
+    assert list(frame["date"].dt.strftime("%Y-%m-%d")) == ["2024-01-01", "2024-01-02", "2024-01-03"]
+    assert list(frame["sales"]) == [2, 4, 4]
@@ -0,0 +1,176 @@
+import multiprocessing
+import threading
+
+import pandas as pd
+import pytest
+
+from modules.dataset import SalesDataset, VersionedCache
+from modules.rollups import SalesRollups
+
+INITIAL_ROWS = 20
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = str(tmp_path / "sales.csv")
+    pd.DataFrame({
+        "date": [f"2024-01-{day:02d}" for day in range(1, INITIAL_ROWS + 1)],
+        "sales": range(INITIAL_ROWS),
+        "store": [1] * INITIAL_ROWS,
+    }).to_csv(path, index=False)
+    return path
+
+
+def row(i):
+    return {"date": f"2024-03-{i % 28 + 1:02d}", "sales": 1000 + i, "store": 2}
+
+
+def assert_consistent(dataset, rollups=None):
+    df, _ = dataset.read()
+    on_disk = pd.read_csv(dataset.csv_path)
+    pd.testing.assert_frame_equal(df.reset_index(drop=True), on_disk, check_dtype=False)
+    if rollups is not None:
+        rebuilt = SalesRollups()
+        rebuilt.reset(on_disk)
+        assert rollups.series("daily") == rebuilt.series("daily")
+
+
+def test_concurrent_appends_keep_every_row(csv_path):
+    dataset = SalesDataset(csv_path).load()
+    rollups = SalesRollups()
+    dataset.observe(rollups)
+
+    def writer(offset):
+        for i in range(25):
+            dataset.append([row(offset + i)])
+
+    threads = [threading.Thread(target=writer, args=(n * 100,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(dataset) == INITIAL_ROWS + 100
+    assert sorted(dataset.read()[0]["sales"])[-100:] == sorted(
+        1000 + n * 100 + i for n in range(4) for i in range(25))
+    assert_consistent(dataset, rollups)
+
+
+def test_mixed_writes_with_readers(csv_path):
+    dataset = SalesDataset(csv_path).load()
+    rollups = SalesRollups()
+    dataset.observe(rollups)
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            df, version = dataset.read()
+            snapshot = df.copy()
+            # Rollups are updated in the same critical section as the data
+            if version == dataset.version:
+                total = sum(r["sales"] for r in rollups.series("daily"))
+                if dataset.version == version and total != df["sales"].sum():
+                    errors.append((version, total, df["sales"].sum()))
+            # Frames handed out are never modified in place
+            if not df.equals(snapshot):
+                errors.append("frame mutated")
+
+    def writer(seed):
+        for i in range(30):
+            if i % 3 == 0:
+                dataset.append([row(seed + i)])
+            elif i % 3 == 1:
+                dataset.update(i % 10, {"sales": seed + i})
+            else:
+                dataset.delete(0)
+
+    readers = [threading.Thread(target=reader) for _ in range(3)]
+    writers = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(3)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    stop.set()
+    for t in readers:
+        t.join()
+
+    assert errors == []
+    assert len(dataset) == INITIAL_ROWS  # 30 appends, 30 deletes
+    assert_consistent(dataset, rollups)
+
+
+def _append_in_process(csv_path, offset, count):
+    dataset = SalesDataset(csv_path).load()
+    for i in range(count):
+        dataset.append([row(offset + i)])
+
+
+def test_appends_from_several_processes_are_not_lost(csv_path):
+    ctx = multiprocessing.get_context("fork")
+    processes = [ctx.Process(target=_append_in_process, args=(csv_path, n * 100, 15))
+                 for n in range(3)]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+        assert p.exitcode == 0
+
+    dataset = SalesDataset(csv_path).load()
+    assert len(dataset) == INITIAL_ROWS + 45
+    assert_consistent(dataset)
+
+
+def test_other_instance_reloads_and_invalidates_caches(csv_path):
+    a = SalesDataset(csv_path).load()
+    b = SalesDataset(csv_path).load()
+    calls = []
+    cache = VersionedCache(b)
+
+    def compute(df):
+        calls.append(len(df))
+        return len(df)
+
+    assert cache.get_or_compute("rows", compute) == INITIAL_ROWS
+    assert cache.get_or_compute("rows", compute) == INITIAL_ROWS
+    assert calls == [INITIAL_ROWS]
+
+    a.append([row(1)])
+    assert len(b) == INITIAL_ROWS + 1
+    assert cache.get_or_compute("rows", compute) == INITIAL_ROWS + 1
+    assert calls == [INITIAL_ROWS, INITIAL_ROWS + 1]
+
+    a.update(0, {"sales": 99})
+    assert b.read()[0].loc[0, "sales"] == 99
+    a.delete(0)
+    assert len(b) == INITIAL_ROWS
+
+
+def test_tags_agree_across_instances(csv_path):
+    a = SalesDataset(csv_path).load()
+    before = a.tag()
+    a.append([row(1)])
+    a.append([row(2)])
+    b = SalesDataset(csv_path).load()
+
+    # Versions count per instance; tags identify the data itself
+    assert a.version != b.version
+    assert a.tag() == b.tag() != before
+
+
+def test_out_of_range_writes_are_rejected(csv_path):
+    dataset = SalesDataset(csv_path).load()
+    version = dataset.version
+    assert not dataset.update(INITIAL_ROWS, {"sales": 1})
+    assert not dataset.delete(-1)
+    assert dataset.version == version
+
+
+def test_refresh_recomputes_cached_value(csv_path):
+    dataset = SalesDataset(csv_path).load()
+    cache = VersionedCache(dataset)
+    calls = []
+    cache.get_or_compute("k", lambda df: calls.append(1))
+    cache.get_or_compute("k", lambda df: calls.append(1))
+    cache.get_or_compute("k", lambda df: calls.append(1), refresh=True)
+    assert len(calls) == 2
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.features import calendar_features, lag_roll_features
+
+LAGS = [1, 7, 30]
+ROLLS = [1, 2, 7, 28, 40]
+
+
+def pandas_features(series, lags, rolls):
+    s = pd.Series(series, dtype=float)
+    expected = {f"lag_{k}": s.shift(k) for k in lags}
+    for r in rolls:
+        window = s.shift(1).rolling(r)
+        expected[f"roll_mean_{r}"] = window.mean()
+        expected[f"roll_std_{r}"] = window.std()
+    return expected
+
+
+def assert_matches_pandas(values, lags=LAGS, rolls=ROLLS):
+    features = lag_roll_features(values, lags, rolls)
+    for i, series in enumerate(values):
+        for name, column in pandas_features(series, lags, rolls).items():
+            np.testing.assert_allclose(features[name][i], column.to_numpy(),
+                                       rtol=1e-9, atol=1e-6, equal_nan=True, err_msg=name)
+
+
+def test_lag_roll_matches_pandas():
+    rng = np.random.default_rng(0)
+    assert_matches_pandas(np.vstack([
+        rng.poisson(14000, 120).astype(float),
+        rng.normal(50, 10, 120),
+        np.full(120, 7.0),
+    ]))
+
+
+def test_lag_roll_nan_gaps_match_pandas():
+    rng = np.random.default_rng(1)
+    values = rng.poisson(200, (2, 90)).astype(float)
+    values[0, [0, 10, 11, 50]] = np.nan
+    values[1, 60:75] = np.nan
+    assert_matches_pandas(values)
+
+
+@pytest.mark.parametrize("length", [0, 1, 5, 28])
+def test_lag_roll_windows_longer_than_series(length):
+    values = np.arange(length, dtype=float)[None, :] * 3 + 1
+    features = lag_roll_features(values, LAGS, ROLLS)
+    assert all(column.shape == (1, length) for column in features.values())
+    if length:
+        assert_matches_pandas(values)
+    assert np.isnan(features["roll_mean_40"]).all()
+    assert np.isnan(features["lag_30"]).all()
+
+
+def test_lag_roll_rejects_1d_input():
+    with pytest.raises(ValueError):
+        lag_roll_features(np.arange(10.0), LAGS, ROLLS)
+
+
+@pytest.mark.parametrize("start, end", [
+    ("2019-12-20", "2021-01-10"),  # 2020 has an ISO week 53
+    ("2004-12-25", "2010-01-06"),  # Jan 1-3 2010 belong to 2009-W53
+    ("1969-12-25", "1970-01-10"),  # day numbers around zero
+])
+def test_calendar_matches_pandas(start, end):
+    dates = pd.Series(pd.date_range(start, end, freq="D"))
+    features = calendar_features(dates.to_numpy())
+
+    expected = {
+        "dow": dates.dt.dayofweek,
+        "week": dates.dt.isocalendar().week.astype(int),
+        "month": dates.dt.month,
+        "day": dates.dt.day,
+        "quarter": dates.dt.quarter,
+        "is_weekend": (dates.dt.dayofweek >= 5).astype(int),
+        "year": dates.dt.year,
+        "dayofyear": dates.dt.dayofyear,
+    }
+    for name, column in expected.items():
+        np.testing.assert_array_equal(features[name], column.to_numpy(), err_msg=name)
+    np.testing.assert_allclose(features["sin_day"], np.sin(2 * np.pi * dates.dt.dayofyear / 365))
+    np.testing.assert_allclose(features["cos_day"], np.cos(2 * np.pi * dates.dt.dayofyear / 365))
+
+
+def test_calendar_unsorted_dates_and_table_growth():
+    dates = pd.to_datetime(["2031-03-01", "2000-02-29", "2031-03-01", "1990-01-01"])
+    features = calendar_features(dates.to_numpy())
+    assert list(features["day"]) == [1, 29, 1, 1]
+    assert list(features["year"]) == [2031, 2000, 2031, 1990]
+    assert list(features["week"]) == list(dates.isocalendar().week)
@@ -0,0 +1,53 @@
+import json
+import os
+
+import pytest
+
+from modules import metrics
+
+
+@pytest.fixture
+def shared_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics, "_multiprocess_dir", None)
+    monkeypatch.setattr(metrics, "_process_file", None)
+    for histogram in metrics.HISTOGRAMS:
+        monkeypatch.setattr(histogram, "_series", {})
+    return str(tmp_path)
+
+
+def count_line(text, endpoint):
+    prefix = f'aura_http_request_duration_seconds_count{{endpoint="{endpoint}",'
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_render_sums_every_process(shared_dir):
+    metrics.enable_multiprocess(shared_dir)
+    metrics.finish_request("/data", "GET", 200, 0.002)
+    metrics.finish_request("/data", "GET", 200, 0.2)
+
+    # Another worker's file
+    other = {
+        metrics.REQUEST_DURATION.name: [
+            [["/data", "GET", "200"], [1] * len(metrics.BUCKETS) + [0.0005, 1]]],
+        metrics.STAGE_DURATION.name: [],
+    }
+    with open(os.path.join(shared_dir, "1.json"), "w") as f:
+        json.dump(other, f)
+
+    text = metrics.render_prometheus()
+    assert count_line(text, "/data") == [
+        'aura_http_request_duration_seconds_count{endpoint="/data",method="GET",status="200"} 3']
+    assert ('aura_http_request_duration_seconds_bucket{endpoint="/data",method="GET",'
+            'status="200",le="0.005"} 2') in text
+
+
+def test_reset_drops_inherited_series(shared_dir):
+    metrics.finish_request("/ping", "GET", 200, 0.001)
+    metrics.enable_multiprocess(shared_dir, reset=True)
+    assert count_line(metrics.render_prometheus(), "/ping") == []
+
+
+def test_clear_removes_previous_run(shared_dir):
+    metrics.enable_multiprocess(shared_dir)
+    metrics.clear_multiprocess_dir(shared_dir)
+    assert os.listdir(shared_dir) == []
@@ -0,0 +1,13 @@
+import pytest
+
+from modules.names import is_safe_name
+
+
+@pytest.mark.parametrize("value", ["default", "widget-1", "forecast_90", "2024"])
+def test_safe_names(value):
+    assert is_safe_name(value)
+
+
+@pytest.mark.parametrize("value", ["", "abc\n", "a/b", "..", "a.b", "a b", "forecast-30.0"])
+def test_unsafe_names(value):
+    assert not is_safe_name(value)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.optimizer import run_optimization
+from modules.policy_store import PolicyStore
+
+N_SIMS = 20
+
+
+@pytest.fixture(scope="module")
+def forecast():
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        "date": pd.date_range("2024-01-01", periods=60),
+        "demand": rng.normal(14000, 3000, 60).clip(0).round(),
+    })
+
+
+@pytest.fixture(scope="module")
+def all_policies(forecast):
+    # Full grid under the same (fixed-seed) scenarios as the constrained search
+    result = run_optimization(forecast, n_sims=N_SIMS, n_jobs=1)
+    return pd.DataFrame(result["all_policies"])
+
+
+@pytest.mark.parametrize("target", [0.3, 0.5, 0.7, 0.9, 0.95, 0.99])
+def test_constrained_search_matches_filtered_grid(forecast, all_policies, target):
+    result = run_optimization(forecast, n_sims=N_SIMS, n_jobs=1, target_fill_rate=target)
+
+    feasible = all_policies[all_policies["mean_fill_rate"] >= target]
+    assert result["search"]["feasible"] == (len(feasible) > 0)
+    if len(feasible):
+        expected = feasible.loc[feasible["mean_cost"].idxmin()]
+        assert result["optimal_policy"]["reorder_point"] == expected["R"]
+        assert result["optimal_policy"]["order_quantity"] == expected["Q"]
+        assert result["monte_carlo_stats"]["mean_cost"] == expected["mean_cost"]
+
+
+@pytest.mark.parametrize("scale", [0.97, 1.0, 1.05])
+def test_warm_start_finds_grid_search_optimum(forecast, tmp_path, scale):
+    store = PolicyStore(str(tmp_path))
+    cold = run_optimization(forecast, n_sims=N_SIMS, n_jobs=1, policy_store=store)
+    assert cold["search"]["mode"] == "cold"
+
+    rng = np.random.default_rng(2)
+    perturbed = forecast.assign(
+        demand=(forecast["demand"] * scale * rng.normal(1, 0.02, len(forecast))).round())
+    warm = run_optimization(perturbed, n_sims=N_SIMS, n_jobs=1, policy_store=store)
+    full = run_optimization(perturbed, n_sims=N_SIMS, n_jobs=1)
+
+    assert warm["search"]["mode"] == "warm"
+    assert warm["optimal_policy"]["reorder_point"] == full["optimal_policy"]["reorder_point"]
+    assert warm["optimal_policy"]["order_quantity"] == full["optimal_policy"]["order_quantity"]
+    assert warm["monte_carlo_stats"]["mean_cost"] == full["monte_carlo_stats"]["mean_cost"]
+    assert warm["search"]["policies_evaluated"] < warm["search"]["grid_size"]
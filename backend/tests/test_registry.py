@@ -0,0 +1,63 @@
+import threading
+import time
+
+import pytest
+
+from modules import registry as registry_module
+from modules.registry import DatasetRegistry, UnknownComponent
+
+
+@pytest.fixture
+def registry(tmp_path):
+    default_csv = tmp_path / "default.csv"
+    default_csv.write_text("date,sales,store\n2024-01-01,5,1\n")
+    return DatasetRegistry(str(default_csv), str(tmp_path / "components"))
+
+
+def test_unknown_component_raises(registry):
+    with pytest.raises(UnknownComponent):
+        registry.get("missing")
+    assert registry.get("missing", create=True).component_id == "missing"
+    assert registry.ids() == ["default", "missing"]
+
+
+def test_slow_load_does_not_block_other_components(registry, monkeypatch):
+    registry.get("default")
+    registry.get("slow", create=True)
+    registry._loaded.pop("slow")
+
+    release = threading.Event()
+    loads = []
+    original = registry_module.Component
+
+    class SlowComponent(original):
+        def __init__(self, component_id, csv_path):
+            loads.append(component_id)
+            release.wait(5)
+            super().__init__(component_id, csv_path)
+
+    monkeypatch.setattr(registry_module, "Component", SlowComponent)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.get("slow")))
+               for _ in range(3)]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+
+    # Loaded components are served while "slow" is still loading
+    started = time.monotonic()
+    assert registry.get("default").component_id == "default"
+    assert time.monotonic() - started < 1
+
+    release.set()
+    for t in threads:
+        t.join()
+    assert loads == ["slow"]
+    assert len(results) == 3 and all(r is results[0] for r in results)
+
+
+@pytest.mark.parametrize("component_id", ["abc\n", "../abc", "a b", ""])
+def test_invalid_component_ids_are_rejected(registry, component_id):
+    with pytest.raises(ValueError):
+        registry.get(component_id, create=True)
+    assert registry.ids() == ["default"]
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from modules.rollups import SalesRollups
+
+
+@pytest.fixture
+def sales():
+    rng = np.random.default_rng(0)
+    n = 2000
+    return pd.DataFrame({
+        "date": (np.datetime64("2023-11-01") + rng.integers(0, 120, n)).astype(str),
+        "store": rng.integers(1, 6, n),
+        "sales": rng.integers(0, 500, n),
+    })
+
+
+def expected_series(df, granularity, store=None):
+    if store is not None:
+        df = df[df["store"] == store]
+    dates = pd.to_datetime(df["date"])
+    if granularity == "daily":
+        period = dates.dt.strftime("%Y-%m-%d")
+    elif granularity == "weekly":
+        period = (dates - pd.to_timedelta(dates.dt.weekday, unit="D")).dt.strftime("%Y-%m-%d")
+    else:
+        period = dates.dt.strftime("%Y-%m")
+    grouped = df.groupby(period)["sales"]
+    return [
+        {"period": p, "sales": float(total), "rows": int(count)}
+        for p, total, count in zip(grouped.sum().index, grouped.sum(), grouped.count())
+    ]
+
+
+@pytest.mark.parametrize("granularity", ["daily", "weekly", "monthly"])
+def test_reset_matches_groupby(sales, granularity):
+    rollups = SalesRollups()
+    rollups.reset(sales)
+    assert rollups.series(granularity) == expected_series(sales, granularity)
+    for store in range(1, 6):
+        assert rollups.series(granularity, store) == expected_series(sales, granularity, store)
+    assert rollups.stores() == [1, 2, 3, 4, 5]
+
+
+def test_apply_matches_full_rebuild(sales):
+    rollups = SalesRollups()
+    rollups.reset(sales.iloc[:1500])
+    rollups.apply(added=sales.iloc[1500:], removed=sales.iloc[:300])
+    current = sales.iloc[300:]
+    for granularity in ("daily", "weekly", "monthly"):
+        assert rollups.series(granularity) == expected_series(current, granularity)
+        assert rollups.series(granularity, 3) == expected_series(current, granularity, 3)
+
+
+def test_removing_every_row_empties_buckets(sales):
+    rollups = SalesRollups()
+    rollups.reset(sales)
+    rollups.apply(added=sales.iloc[0:0], removed=sales)
+    assert rollups.series("weekly") == []
+    assert rollups.stores() == []
+
+
+def test_series_range_is_inclusive(sales):
+    rollups = SalesRollups()
+    rollups.reset(sales)
+    weeks = rollups.series("weekly", start="2023-11-13", end="2023-12-04")
+    assert [w["period"] for w in weeks] == ["2023-11-13", "2023-11-20", "2023-11-27", "2023-12-04"]
+    months = rollups.series("monthly", start="2023-12", end="2024-01")
+    assert [m["period"] for m in months] == ["2023-12", "2024-01"]
@@ -0,0 +1,13 @@
+"""
+WSGI entry point for production serving.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+With preload_app enabled (see gunicorn.conf.py) this module is imported once
+in the master process: the dataset is loaded, heavy libraries are imported
+and the default forecast is computed before workers fork, so every worker
+starts warm and shares that memory copy-on-write.
+"""
+from app import app, warm_up
+
+warm_up()
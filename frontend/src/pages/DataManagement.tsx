@@ -18,7 +18,9 @@ const DataManagement: React.FC = () => {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const response = await fetch("http://127.0.0.1:5000/data");
+        const response = await fetch(
+          "http://127.0.0.1:5000/data?fields=index,date,sales"
+        );
 
         if (!response.ok) {
           throw new Error(`HTTP error! status: ${response.status}`);
@@ -42,8 +44,8 @@ const DataManagement: React.FC = () => {
               !isNaN(Number(item.sales))
             );
           })
-          .map((item: any, index: number) => ({
-            id: index.toString(),
+          .map((item: any) => ({
+            id: item.index.toString(),
             date: item.date,
             sales: Number(item.sales), // Ensure sales is a number
           }))
@@ -99,17 +101,12 @@ const DataManagement: React.FC = () => {
         body: JSON.stringify([apiRecord]),
       });
       if (response.ok) {
-        // Refetch data
-        const fetchResponse = await fetch("http://127.0.0.1:5000/data");
-        const data = await fetchResponse.json();
-        const mappedData: SalesRecord[] = data.map(
-          (item: any, index: number) => ({
-            id: index.toString(),
-            date: item.date,
-            sales: item.sales,
-          })
-        );
-        setRecords(mappedData);
+        // New rows are appended server-side; no need to refetch the full list
+        const { start_index } = await response.json();
+        setRecords((prev) => [
+          ...prev,
+          { id: start_index.toString(), date: record.date, sales: record.sales },
+        ]);
       }
     } catch (error) {
       console.error("Error adding record:", error);
@@ -163,17 +160,17 @@ const DataManagement: React.FC = () => {
           method: "DELETE",
         });
         if (response.ok) {
-          // Refetch data to update indices
-          const fetchResponse = await fetch("http://127.0.0.1:5000/data");
-          const data = await fetchResponse.json();
-          const mappedData: SalesRecord[] = data.map(
-            (item: any, index: number) => ({
-              id: index.toString(),
-              date: item.date,
-              sales: item.sales,
-            })
+          // Rows after the deleted one shift down by one server-side
+          setRecords((prev) =>
+            prev
+              .filter((record) => record.id !== id)
+              .map((record) => {
+                const recordIndex = parseInt(record.id);
+                return recordIndex > index
+                  ? { ...record, id: (recordIndex - 1).toString() }
+                  : record;
+              })
           );
-          setRecords(mappedData);
         }
       } catch (error) {
         console.error("Error deleting record:", error);